@@ -2,11 +2,23 @@ import sys
 import os
 import json
 import re
+import asyncio
+import atexit
+import copy
+import functools
+import hashlib
 import logging
-from pathlib import Path
-from typing import List, Dict, Any
-from openai import OpenAI
+import threading
 import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Any, AsyncGenerator, Generator, Optional, Set, Tuple
+from openai import OpenAI, AsyncOpenAI, APIConnectionError, APITimeoutError, RateLimitError
+import httpx
+import numpy as np
+import tiktoken
+from aiolimiter import AsyncLimiter
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
 
 from slack_sdk.errors import SlackApiError
 
@@ -14,199 +26,890 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from config import settings
+from core.async_runner import run_sync
+
+# Maximum number of chunk extraction requests in flight at once
+MAX_CONCURRENT_REQUESTS = 8
 
 client = OpenAI(api_key=settings.OPENAI_API_KEY)
+# One shared async HTTP pool sized to the request concurrency, so TLS/TCP
+# connections are reused across every chunk in a run (and across runs).
+async_http_client = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=MAX_CONCURRENT_REQUESTS,
+        max_keepalive_connections=MAX_CONCURRENT_REQUESTS
+    ),
+    timeout=httpx.Timeout(60.0, connect=10.0)
+)
+# Retries are handled by the tenacity policy below rather than by the SDK
+async_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, http_client=async_http_client, max_retries=0)
+
+
+def _close_async_http_client():
+    """Closes the shared async HTTP pool at interpreter exit."""
+    if not async_http_client.is_closed:
+        try:
+            run_sync(async_http_client.aclose())
+        except Exception as e:
+            logging.debug(f"Failed to close async HTTP client cleanly: {e}")
+
+
+atexit.register(_close_async_http_client)
 
+# Token bucket sized to the account's requests-per-minute limit. Bursts go
+# through immediately; calls only wait when the real limit is approached.
+REQUESTS_PER_MINUTE = 500
+_rpm_limiter = AsyncLimiter(max_rate=REQUESTS_PER_MINUTE, time_period=60)
+
+# Per-call hard timeouts. A slow outlier is cut off and retried instead of
+# holding a concurrency slot; categorization streams a much larger answer.
+EXTRACTION_TIMEOUT_SECONDS = 15.0
+CATEGORIZATION_TIMEOUT_SECONDS = 180.0
+
+# Bounded retry with jittered exponential backoff for transient OpenAI failures
+_openai_retry = retry(
+    retry=retry_if_exception_type((APITimeoutError, APIConnectionError, RateLimitError)),
+    wait=wait_random_exponential(min=1, max=20),
+    stop=stop_after_attempt(4),
+    reraise=True,
+)
+
+# Scraped sites repeat boilerplate (nav, footers, cookie banners) across pages,
+# so extraction results are cached by chunk content hash. The extraction call
+# runs at a low temperature, so a cached answer is as good as a fresh one.
+CHUNK_CACHE_MAXSIZE = 2048
+_chunk_keyword_cache: "OrderedDict[tuple, List[str]]" = OrderedDict()
+chunk_cache_stats = {"hits": 0, "misses": 0}
+
+# Chunks are sized in real tokens (via tiktoken) so that the system prompt plus
+# the chunk text fits in MAX_PROMPT_TOKENS.
 MAX_PROMPT_TOKENS = 3000
-CHARS_PER_TOKEN = 4
-MAX_CHUNK_SIZE = MAX_PROMPT_TOKENS * CHARS_PER_TOKEN
+# Small chunks are packed into a single request (as numbered sections) so the
+# static instructions are paid for once per request rather than once per chunk.
+CHUNKS_PER_REQUEST = 4
+BATCH_TOKEN_FILL_RATIO = 0.9
+# Share of each chunk's token budget repeated at the start of the next chunk
+CHUNK_OVERLAP_RATIO = 0.1
+MIN_CHUNK_CHARS = 100
+# Sentence boundary used to split scraped text into chunks
+_SENT_SPLIT = re.compile(r'(?<=[.?!])\s+')
+# Website chrome that shows up in almost every scrape and never yields a keyword
+# worth tracking. Stripped locally so it doesn't cost input tokens, but only where
+# it stands alone on a line (the scraper puts each link, button and headline on
+# its own line) so that prose such as "sign up bonus" is never cut up.
+_BOILERPLATE_PHRASES = (
+    "skip to (?:main )?content", "accept all cookies", "accept cookies", "cookie settings", "cookie policy",
+    "privacy policy", "terms of use", "terms and conditions", "all rights reserved", "sign in", "sign up",
+    "log in", "log out", "my account", "add to (?:cart|bag|basket)", "view cart", "shop now",
+    "learn more", "read more", "see more", "show more", "load more", "sort by", "filter by",
+    "back to top", "subscribe to our newsletter", "follow us", "share this",
+)
+_BOILERPLATE_PATTERN = re.compile(
+    r"^[^\w\n]*(?:" + "|".join(_BOILERPLATE_PHRASES) + r")[^\w\n]*$", re.IGNORECASE | re.MULTILINE
+)
+_WHITESPACE = re.compile(r"\s+")
+
+# OpenAI Batch API polling for non-interactive scans
+BATCH_POLL_INTERVAL_SECONDS = 30
+BATCH_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
 
+def _strip_boilerplate(text: str) -> str:
+    """
+    Removes lines of scraped text that are nothing but a common website UI phrase
+    (cookie banners, nav, cart buttons), then joins the rest into one line.
+    """
+    return _WHITESPACE.sub(" ", _BOILERPLATE_PATTERN.sub(" ", text)).strip()
+
+
+@functools.lru_cache(maxsize=4)
+def _encoder(model: str) -> "tiktoken.Encoding":
+    """Returns the (cached) tiktoken encoder for a model."""
+    return tiktoken.encoding_for_model(model)
+
+
+def _count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """Counts the tokens a piece of text costs for the given model."""
+    return len(_encoder(model).encode(text))
+
+
+@functools.lru_cache(maxsize=4)
+def _chunk_token_budget(model: str) -> int:
+    """Tokens left for chunk text once the static prompt parts are accounted for."""
+    prompt_prefix_tokens = (
+        _count_tokens(KEYWORD_EXTRACTION_SYSTEM_PROMPT, model)
+        + _count_tokens(_PROMPT_TEMPLATE.format_map({"chunk": ""}), model)
+    )
+    return MAX_PROMPT_TOKENS - prompt_prefix_tokens
+
+
+def _split_text_into_chunks(text: str, model: str = "gpt-3.5-turbo") -> List[Tuple[str, int]]:
+    """
+    Splits text on sentence boundaries into chunks that fit the model's chunk
+    token budget. A single sentence longer than the budget (e.g. headline-only
+    text with no punctuation) is cut on token boundaries.
 
-def _split_text_into_chunks(text: str) -> List[str]:
-    # This function remains unchanged
+    Consecutive chunks overlap by roughly CHUNK_OVERLAP_RATIO of the budget so
+    a phrase that straddles a boundary is seen whole in at least one chunk.
+
+    Returns (chunk, token_count) pairs. Counts are the same per-sentence sums the
+    budget is checked against, so they may slightly overestimate the joined text.
+    """
     if not text:
         return []
+    encoder = _encoder(model)
+    budget = _chunk_token_budget(model)
+    overlap_budget = int(budget * CHUNK_OVERLAP_RATIO)
     chunks = []
-    current_chunk = ""
-    segments = re.split(r'(?<=[.?!])\s+', text)
-    for segment in segments:
-        if len(current_chunk) + len(segment) + 1 > MAX_CHUNK_SIZE:
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-            current_chunk = segment
-        else:
-            current_chunk += (" " + segment) if current_chunk else segment
-    if current_chunk:
-        chunks.append(current_chunk.strip())
+    # (segment, token_count) pairs making up the chunk being built
+    current_parts: List[Tuple[str, int]] = []
+    current_tokens = 0
+
+    def _flush() -> None:
+        nonlocal current_parts, current_tokens
+        chunks.append((" ".join(segment for segment, _ in current_parts).strip(), current_tokens))
+        # Carry the trailing sentences over into the next chunk
+        overlap_parts: List[Tuple[str, int]] = []
+        overlap_tokens = 0
+        for segment, tokens in reversed(current_parts[1:]):
+            if overlap_tokens + tokens + 1 > overlap_budget:
+                break
+            overlap_parts.insert(0, (segment, tokens))
+            overlap_tokens += tokens + 1
+        current_parts = overlap_parts
+        current_tokens = max(overlap_tokens - 1, 0)
+
+    for segment in _SENT_SPLIT.split(text):
+        token_ids = encoder.encode(segment)
+        if len(token_ids) > budget:
+            if current_parts:
+                _flush()
+                current_parts = []
+                current_tokens = 0
+            stride = budget - overlap_budget
+            chunks.extend(
+                (encoder.decode(token_ids[i:i + budget]).strip(), len(token_ids[i:i + budget]))
+                for i in range(0, max(len(token_ids) - overlap_budget, 1), stride)
+            )
+            continue
+        if current_parts and current_tokens + len(token_ids) + 1 > budget:
+            _flush()
+            if current_parts and current_tokens + len(token_ids) + 1 > budget:
+                current_parts = []
+                current_tokens = 0
+        current_tokens += len(token_ids) + 1 if current_parts else len(token_ids)
+        current_parts.append((segment, len(token_ids)))
+    if current_parts:
+        chunks.append((" ".join(segment for segment, _ in current_parts).strip(), current_tokens))
     return chunks
 
 
-def _extract_keywords_from_chunk(
+# Static instructions are sent as the system message; the user message carries
+# only the text to analyze.
+KEYWORD_EXTRACTION_SYSTEM_PROMPT = (
+    "You are a skilled and experienced search marketing analyst. "
+    "Your task is to analyze the web page content provided by the user and identify a list of "
+    "highly relevant and commercially valuable keywords, focusing on topics and entities mentioned in the text.\n\n"
+    "The keywords should be:\n"
+    "- Directly related to the products, services, or topics discussed.\n"
+    "- Phrases that a potential customer would use in a search engine.\n"
+    "- A mix of short-tail and long-tail keywords.\n"
+    "- Do not include generic words or adjectives. Only keywords that you think some business would want to track!\n"
+    "For example, do not include something like 'Recommended'\n"
+    "Also, the data you get is from a website dump, make sure not accidentally add website elements like the keyword 'filter'\n"
+    "- Return ONLY a single JSON object of the form {\"keywords\": [\"keyword 1\", \"keyword 2\"]}. "
+    "Do not include any explanations, introductory text, or concluding remarks outside of the JSON.\n\n"
+    "The text to analyze is given between '--- START OF TEXT ---' and '--- END OF TEXT ---' markers. "
+    "If the text is divided into numbered '[SECTION n]' blocks, analyze each section separately and instead return "
+    "a JSON object mapping each section number to its keyword list, e.g. {\"1\": [\"keyword\"], \"2\": [\"keyword\"]}."
+)
+
+# The per-request user message; only the chunk text varies between calls.
+_PROMPT_TEMPLATE = (
+    "--- START OF TEXT ---\n"
+    "{chunk}\n"
+    "--- END OF TEXT ---"
+)
+
+
+@_openai_retry
+async def _create_chat_completion(**kwargs):
+    """
+    Sends a chat completion request through the RPM limiter with a hard
+    timeout, retrying with backoff on rate limits, timeouts and dropped connections.
+    """
+    kwargs.setdefault("timeout", EXTRACTION_TIMEOUT_SECONDS)
+    async with _rpm_limiter:
+        return await async_client.chat.completions.create(**kwargs)
+
+
+@_openai_retry
+def _create_chat_completion_sync(**kwargs):
+    """Synchronous counterpart of _create_chat_completion for one-off calls."""
+    return client.chat.completions.create(**kwargs)
+
+
+def _chunk_cache_key(text_chunk: str, model: str) -> tuple:
+    """Builds the cache key for a chunk from the model name and a hash of its content."""
+    return model, hashlib.blake2b(text_chunk.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _chunk_cache_get(cache_key: tuple):
+    """Returns the cached keywords for a chunk, or None on a miss."""
+    keywords = _chunk_keyword_cache.get(cache_key)
+    if keywords is None:
+        chunk_cache_stats["misses"] += 1
+        return None
+    _chunk_keyword_cache.move_to_end(cache_key)
+    chunk_cache_stats["hits"] += 1
+    return list(keywords)
+
+
+def _chunk_cache_put(cache_key: tuple, keywords: List[str]) -> None:
+    """Stores a chunk's keywords, evicting the least recently used entry when full."""
+    _chunk_keyword_cache[cache_key] = list(keywords)
+    _chunk_keyword_cache.move_to_end(cache_key)
+    if len(_chunk_keyword_cache) > CHUNK_CACHE_MAXSIZE:
+        _chunk_keyword_cache.popitem(last=False)
+
+
+def _parse_keyword_list(raw_response: str) -> Optional[List[str]]:
+    """
+    Parses the model's JSON answer ({"keywords": [...]}) into clean keywords.
+    Returns None if the answer can't be parsed, so it isn't mistaken for "no keywords".
+    """
+    try:
+        data = json.loads(raw_response)
+        keywords = data["keywords"]
+    except (json.JSONDecodeError, AttributeError, KeyError, TypeError) as e:
+        logging.warning(f"Could not parse keyword JSON ({e}). Raw: {raw_response[:50]}...")
+        return None
+    if not isinstance(keywords, list):
+        logging.warning(f"Keyword JSON has no keyword list. Raw: {raw_response[:50]}...")
+        return None
+    return [kw.strip().lower() for kw in keywords if isinstance(kw, str) and kw.strip()]
+
+
+def _parse_sectioned_keywords(raw_response: str, section_count: int) -> List[Optional[List[str]]]:
+    """
+    Parses a {"1": [...], "2": [...]} answer into one keyword list per section.
+    A section the answer doesn't cover (or the whole answer, if it can't be parsed) is None.
+    """
+    try:
+        data = json.loads(raw_response)
+    except json.JSONDecodeError as e:
+        logging.warning(f"Could not parse sectioned keyword JSON ({e}). Raw: {raw_response[:50]}...")
+        return [None] * section_count
+    if not isinstance(data, dict):
+        logging.warning(f"Sectioned keyword JSON is not an object. Raw: {raw_response[:50]}...")
+        return [None] * section_count
+
+    sections = []
+    for i in range(1, section_count + 1):
+        keywords = data.get(str(i))
+        if not isinstance(keywords, list):
+            logging.warning(f"Sectioned keyword JSON is missing section {i}.")
+            sections.append(None)
+            continue
+        sections.append([kw.strip().lower() for kw in keywords if isinstance(kw, str) and kw.strip()])
+    return sections
+
+
+def _pack_chunk_batches(chunks: List[Tuple[str, int]], model: str = "gpt-3.5-turbo") -> List[List[str]]:
+    """
+    Groups consecutive (chunk, token_count) pairs from _split_text_into_chunks
+    into batches of up to CHUNKS_PER_REQUEST, starting a new batch whenever the
+    combined token count would exceed BATCH_TOKEN_FILL_RATIO of the chunk token budget.
+    """
+    max_batch_tokens = int(_chunk_token_budget(model) * BATCH_TOKEN_FILL_RATIO)
+    batches = []
+    current_batch = []
+    current_tokens = 0
+    for chunk, chunk_tokens in chunks:
+        if current_batch and (
+                len(current_batch) >= CHUNKS_PER_REQUEST or current_tokens + chunk_tokens > max_batch_tokens):
+            batches.append(current_batch)
+            current_batch = []
+            current_tokens = 0
+        current_batch.append(chunk)
+        current_tokens += chunk_tokens
+    if current_batch:
+        batches.append(current_batch)
+    return batches
+
+
+def _split_cached_chunks(chunks: List[str], model: str) -> Tuple[List[str], List[Tuple[tuple, str]]]:
+    """
+    Drops chunks too short to analyze and answers cached ones locally.
+    Returns the cached keywords and the (cache_key, chunk) pairs still to be sent.
+    """
+    cached = []
+    pending = []
+    for chunk in chunks:
+        if not chunk or len(chunk) < MIN_CHUNK_CHARS:
+            continue
+        cache_key = _chunk_cache_key(chunk, model)
+        cached_keywords = _chunk_cache_get(cache_key)
+        if cached_keywords is not None:
+            cached.extend(cached_keywords)
+        else:
+            pending.append((cache_key, chunk))
+    return cached, pending
+
+
+def _build_extraction_request(chunks: List[str], model: str) -> Dict[str, Any]:
+    """
+    Builds the chat completion arguments for one or more chunks. A single chunk
+    is sent as-is; several chunks are sent as numbered sections.
+    """
+    if len(chunks) == 1:
+        text = chunks[0]
+    else:
+        text = "\n\n".join(f"[SECTION {i}]\n{chunk}" for i, chunk in enumerate(chunks, start=1))
+    user_message = _PROMPT_TEMPLATE.format_map({"chunk": text})
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": KEYWORD_EXTRACTION_SYSTEM_PROMPT},
+            {"role": "user", "content": user_message},
+        ],
+        "temperature": 0.4,
+        "max_tokens": 512 * len(chunks),
+        "response_format": {"type": "json_object"},
+    }
+
+
+def _parse_extraction_response(raw_response: str, chunk_count: int) -> List[Optional[List[str]]]:
+    """Parses an extraction answer into one keyword list per chunk sent (None where parsing failed)."""
+    if chunk_count == 1:
+        return [_parse_keyword_list(raw_response)]
+    return _parse_sectioned_keywords(raw_response, chunk_count)
+
+
+def _store_extraction_response(pending: List[Tuple[tuple, str]], raw_response: str, keywords: List[str]) -> None:
+    """
+    Adds the parsed keywords of an answer to `keywords`. Only sections that
+    parsed are cached, so a malformed answer is retried on the next scan.
+    """
+    for (cache_key, _), chunk_keywords in zip(pending, _parse_extraction_response(raw_response, len(pending))):
+        if chunk_keywords is None:
+            continue
+        _chunk_cache_put(cache_key, chunk_keywords)
+        keywords.extend(chunk_keywords)
+
+
+async def _extract_keywords_batched(
+        chunks: List[str],
+        model: str = "gpt-3.5-turbo"
+) -> List[str]:
+    """
+    Extracts keywords from one or more chunks with a single request.
+    Cached chunks are answered locally and only the rest are sent.
+    """
+    keywords, pending = _split_cached_chunks(chunks, model)
+    if not pending:
+        return keywords
+
+    try:
+        response = await _create_chat_completion(
+            **_build_extraction_request([chunk for _, chunk in pending], model)
+        )
+        raw_response = (response.choices[0].message.content or "").strip()
+        _store_extraction_response(pending, raw_response, keywords)
+        return keywords
+
+    except Exception as e:
+        logging.error(f"An unexpected error occurred: {e}")
+        return keywords
+
+
+async def _extract_keywords_from_chunk(
         text_chunk: str,
         model: str = "gpt-3.5-turbo"
 ) -> List[str]:
-    # This function remains unchanged
-    if not text_chunk or len(text_chunk) < 100:
-        return []
+    """Extracts keywords from a single chunk of scraped text."""
+    return await _extract_keywords_batched([text_chunk], model=model)
 
-    prompt = (
-        "You are a skilled and experienced search marketing analyst. "
-        "Your task is to analyze the following web page content and identify a list of "
-        "highly relevant and commercially valuable keywords, focusing on topics and entities mentioned in the text.\n\n"
-        "The keywords should be:\n"
-        "- Directly related to the products, services, or topics discussed.\n"
-        "- Phrases that a potential customer would use in a search engine.\n"
-        "- A mix of short-tail and long-tail keywords.\n"
-        "- Do not include generic words or adjectives. Only keywords that you think some business would want to track!\n"
-        "For example, do not include something like 'Recommended'\n"
-        "Also, the data you get is from a website dump, make sure not accidentally add website elements like the keyword 'filter'\n"
-        "- Return ONLY a single, valid Python list of strings. Do not include any explanations, "
-        "introductory text, or concluding remarks outside of the list.\n\n"
-        "Text to analyze:\n"
-        "--- START OF TEXT ---\n"
-        f"{text_chunk}\n"
-        "--- END OF TEXT ---\n\n"
-        "Generate a list of keywords:"
-    )
+
+def _extract_keywords_via_batch_api(
+        batches: List[List[str]],
+        model: str = "gpt-3.5-turbo"
+) -> List[str]:
+    """
+    Submits all extraction requests as one OpenAI Batch API job and waits for it.
+    Batch jobs cost half as much and use a separate rate-limit pool, at the price
+    of latency, so this is meant for non-interactive scans.
+    """
+    keywords = []
+    requests_to_submit = []
+    for batch in batches:
+        cached, pending = _split_cached_chunks(batch, model)
+        keywords.extend(cached)
+        if pending:
+            requests_to_submit.append(pending)
+
+    if not requests_to_submit:
+        return keywords
+
+    jsonl_lines = [
+        json.dumps({
+            "custom_id": f"request-{i}",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": _build_extraction_request([chunk for _, chunk in pending], model),
+        })
+        for i, pending in enumerate(requests_to_submit)
+    ]
 
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.4,
-            max_tokens=512,
+        input_file = client.files.create(
+            file=("keyword_extraction.jsonl", "\n".join(jsonl_lines).encode("utf-8")),
+            purpose="batch"
         )
-        raw_response = response.choices[0].message.content.strip()
-
-        if not raw_response.startswith('[') or not raw_response.endswith(']'):
-            logging.warning(f"Response does not start/end with brackets. Raw: {raw_response[:50]}...")
-            match = re.search(r'\[(.*)', raw_response, re.DOTALL)
-            if match:
-                content_without_brackets = match.group(1).split(', ')
-                keywords_clean = [re.sub(r'["\']', '', kw).strip() for kw in content_without_brackets]
-                return [kw for kw in keywords_clean if kw]
-            return []
+        batch_job = client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        logging.info(f"📦 Submitted batch job {batch_job.id} with {len(jsonl_lines)} requests.")
 
-        content_without_brackets = raw_response[1:-1]
-        keywords_dirty = re.split(r'["\'],\s*["\']', content_without_brackets)
-        keywords_clean = []
-        for keyword in keywords_dirty:
-            clean_kw = keyword.strip().strip("'\"")
-            if clean_kw:
-                keywords_clean.append(clean_kw)
-        return keywords_clean
+        while batch_job.status not in BATCH_TERMINAL_STATUSES:
+            time.sleep(BATCH_POLL_INTERVAL_SECONDS)
+            batch_job = client.batches.retrieve(batch_job.id)
+            logging.info(f"Batch job {batch_job.id} status: {batch_job.status}")
 
+        if batch_job.status != "completed" or not batch_job.output_file_id:
+            logging.error(f"❌ Batch job {batch_job.id} ended with status '{batch_job.status}'.")
+            return keywords
+
+        output_text = client.files.content(batch_job.output_file_id).text
     except Exception as e:
-        logging.error(f"An unexpected error occurred: {e}")
-        return []
+        logging.error(f"❌ An error occurred while running the batch job: {e}", exc_info=True)
+        return keywords
 
+    for line in output_text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            result = json.loads(line)
+            pending = requests_to_submit[int(result["custom_id"].split("-")[1])]
+        except (json.JSONDecodeError, KeyError, IndexError, ValueError, TypeError, AttributeError) as e:
+            logging.warning(f"Skipping unreadable batch output line ({e}): {line[:80]}...")
+            continue
+        response_body = (result.get("response") or {}).get("body") or {}
+        choices = response_body.get("choices") or []
+        if not choices:
+            logging.warning(f"Batch request {result['custom_id']} returned no choices: {result.get('error')}")
+            continue
+        raw_response = ((choices[0].get("message") or {}).get("content") or "").strip()
+        _store_extraction_response(pending, raw_response, keywords)
 
-def extract_keywords_from_scraped_text(
-        consolidated_text: str,
-        max_keywords: int = 100
-) -> List[str]:
-    # This function remains unchanged
-    if not consolidated_text:
-        return []
-    chunks = _split_text_into_chunks(consolidated_text)
+    return keywords
+
+
+def _collect_keywords(results: List[Any], max_keywords: int) -> List[str]:
+    """Normalizes and de-duplicates keyword lists from extraction tasks."""
     all_keywords = set()
-    logging.info(f"Divided text into {len(chunks)} chunks for processing.")
+    for result in results:
+        if isinstance(result, BaseException):
+            logging.error(f"Chunk extraction failed: {result}")
+            continue
+        for keyword in result:
+            normalized_keyword = keyword.lower().strip()
+            if normalized_keyword:
+                all_keywords.add(normalized_keyword)
+
+    if len(all_keywords) >= max_keywords:
+        logging.info(f"🎉 Reached max_keywords limit of {max_keywords}.")
+    logging.info(f"Chunk cache stats: {chunk_cache_stats}")
+
+    return list(all_keywords)[:max_keywords]
+
+
+def _text_to_batches(text: str, seen_chunks: Optional[Set[str]] = None) -> List[List[str]]:
+    """
+    Filters, chunks and packs a piece of scraped text into extraction requests.
+    Chunks already in seen_chunks (e.g. navigation text repeated on every page
+    of a crawl) are dropped before any request is built.
+    """
+    if seen_chunks is None:
+        seen_chunks = set()
+    filtered_text = _strip_boilerplate(text)
+    chunks = _split_text_into_chunks(filtered_text)
+    unique_chunks = []
+    for chunk, chunk_tokens in chunks:
+        if chunk not in seen_chunks:
+            seen_chunks.add(chunk)
+            unique_chunks.append((chunk, chunk_tokens))
+    batches = _pack_chunk_batches(unique_chunks)
+    logging.info(f"Divided {len(filtered_text)} characters (of {len(text)} scraped) into {len(chunks)} chunks "
+                 f"({len(chunks) - len(unique_chunks)} duplicates skipped), packed into {len(batches)} requests.")
+    return batches
+
 
-    for i, chunk in enumerate(chunks):
-        if len(all_keywords) >= max_keywords:
-            logging.info(f"🎉 Reached max_keywords limit of {max_keywords}. Stopping processing.")
-            break
+async def _extract_until_limit(batches: AsyncGenerator[List[str], None], max_keywords: int) -> List[str]:
+    """
+    Dispatches an extraction task per batch (at most MAX_CONCURRENT_REQUESTS in
+    flight) and collects keywords as tasks finish. As soon as max_keywords unique
+    keywords are found, queued workers skip their OpenAI call, in-flight tasks
+    are cancelled and the source is closed, even while it is waiting for its
+    next batch.
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    done = asyncio.Event()
+    all_keywords = set()
+    tasks = []
 
-        logging.info(f"Processing chunk {i + 1}/{len(chunks)} (size: {len(chunk)} characters)...")
-        keywords_from_chunk = _extract_keywords_from_chunk(text_chunk=chunk)
-        for keyword in keywords_from_chunk:
+    async def _worker(batch: List[str]) -> List[str]:
+        async with semaphore:
+            if done.is_set():
+                return []
+            logging.info(f"Processing request ({len(batch)} chunks, {sum(len(c) for c in batch)} characters)...")
+            return await _extract_keywords_batched(batch)
+
+    def _on_task_done(task: asyncio.Task) -> None:
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            logging.error(f"Chunk extraction failed: {task.exception()}")
+            return
+        for keyword in task.result():
             normalized_keyword = keyword.lower().strip()
             if normalized_keyword:
                 all_keywords.add(normalized_keyword)
-        time.sleep(0.5)
+        if len(all_keywords) >= max_keywords and not done.is_set():
+            done.set()
+            logging.info(f"🎉 Reached max_keywords limit of {max_keywords}. Cancelling pending requests.")
+            for pending_task in tasks:
+                if not pending_task.done():
+                    pending_task.cancel()
+
+    done_waiter = asyncio.ensure_future(done.wait())
+    try:
+        while not done.is_set():
+            next_batch = asyncio.ensure_future(batches.__anext__())
+            await asyncio.wait((next_batch, done_waiter), return_when=asyncio.FIRST_COMPLETED)
+            if not next_batch.done():
+                # The limit was reached while the source was still producing a batch
+                next_batch.cancel()
+                await asyncio.gather(next_batch, return_exceptions=True)
+                break
+            try:
+                batch = next_batch.result()
+            except StopAsyncIteration:
+                break
+            task = asyncio.create_task(_worker(batch))
+            task.add_done_callback(_on_task_done)
+            tasks.append(task)
+    finally:
+        done_waiter.cancel()
+        await batches.aclose()
 
+    await asyncio.gather(*tasks, return_exceptions=True)
+    logging.info(f"Chunk cache stats: {chunk_cache_stats}")
     return list(all_keywords)[:max_keywords]
 
 
+def extract_keywords_from_scraped_text(
+        consolidated_text: str,
+        max_keywords: int = 100,
+        use_batch_api: bool = False
+) -> List[str]:
+    """
+    Splits the scraped text into chunks and extracts keywords from all of them
+    concurrently, capped at MAX_CONCURRENT_REQUESTS in-flight OpenAI calls.
+    With use_batch_api=True the requests are submitted as one Batch API job instead.
+    """
+    if not consolidated_text:
+        return []
+    batches = _text_to_batches(consolidated_text)
+
+    if use_batch_api:
+        return _collect_keywords([_extract_keywords_via_batch_api(batches)], max_keywords)
+
+    async def _batch_source() -> AsyncGenerator[List[str], None]:
+        for batch in batches:
+            yield batch
+
+    return run_sync(_extract_until_limit(_batch_source(), max_keywords))
+
+
+def extract_keywords_from_pages(
+        pages: Generator[str, None, None],
+        max_keywords: int = 100
+) -> List[str]:
+    """
+    Extracts keywords from page texts as they are produced (e.g. by
+    WebScraper.iter_pages). The page iterator is advanced in a worker thread,
+    and each page's extraction requests are dispatched immediately, so
+    scraping and LLM calls overlap instead of running back to back.
+    Crawling stops early once max_keywords keywords have been found: the page
+    generator is closed, which cancels a WebScraper crawl.
+    """
+    seen_chunks: Set[str] = set()
+    # Held while a worker thread advances the generator, which can't be closed mid-step
+    next_page_lock = threading.Lock()
+
+    def _next_page() -> Optional[str]:
+        with next_page_lock:
+            return next(pages, None)
+
+    async def _batch_source() -> AsyncGenerator[List[str], None]:
+        while True:
+            page_text = await asyncio.to_thread(_next_page)
+            if page_text is None:
+                return
+            for batch in _text_to_batches(page_text, seen_chunks):
+                yield batch
+
+    try:
+        return run_sync(_extract_until_limit(_batch_source(), max_keywords))
+    finally:
+        # A page the limit interrupted may still be in progress; close once it returns
+        with next_page_lock:
+            pages.close()
+
+
+# Stage 1 of categorization: keywords that clearly belong to an existing ad group
+# are routed locally by embedding similarity, without an LLM call.
+EMBEDDING_MODEL = "text-embedding-3-small"
+ROUTING_SIMILARITY_THRESHOLD = 0.8
+UNCATEGORIZED_CATEGORY_NAME = "Uncategorized"
+
+# Stage 2: only the keywords that could not be routed are sent to the LLM, along
+# with a brief outline of the existing categories. The model returns one
+# assignment per keyword instead of re-emitting the whole structure.
+# 🔑 PROMPT FIXES: Added SCORING STEP to prioritize new, distinct categories.
+# The rules and schema are sent as the system message, the data as the user message.
+CATEGORIZATION_SYSTEM_PROMPT = (
+    "You are a meticulous data architect and marketing strategist. Your **primary and non-negotiable task** is to assign **every single keyword** from the `NEW KEYWORDS` list to a category and ad group. If you omit any keyword, the output is invalid.\n\n"
+    "### Categorization Rules\n"
+    "1. **SCORING/INITIAL STEP:** First analyze the `NEW KEYWORDS` list and identify which keywords *must* be grouped into a new category because they do not relate to any existing category (e.g., 'Apple Products' vs 'Clothing').\n"
+    "2. **Existing Categories**: Assign keywords that fit to the most relevant existing category and ad group, using their names exactly as given. Create a new ad group inside an existing category if necessary.\n"
+    "3. **New Categories**: Create new, logical, professional categories for all keywords identified in the SCORING/INITIAL STEP, grouping related keywords into new ad groups.\n\n"
+    "### Output Schema (Strict)\n"
+    "Return a single JSON object with one entry per keyword:\n"
+    "{\"assignments\": [{\"keyword\": \"new keyword\", \"category_name\": \"Example Category\", \"ad_group_name\": \"Example Group\"}]}\n"
+    "Return the RAW JSON object and nothing else."
+)
+
+
+def _compact_json(value: Any) -> str:
+    """Serializes prompt data without indentation whitespace, which only costs tokens."""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def _ad_group_keywords(ad_group: Dict[str, Any]) -> List[str]:
+    """Returns an ad group's keyword list, creating it if it is missing."""
+    return ad_group.setdefault("keywords", [])
+
+
+def _embed_texts(texts: List[str]) -> Dict[str, np.ndarray]:
+    """Embeds texts in one batched call and returns their unit-normalized vectors keyed by text."""
+    unique_texts = list(dict.fromkeys(texts))
+    if not unique_texts:
+        return {}
+    response = client.embeddings.create(model=EMBEDDING_MODEL, input=unique_texts)
+    vectors = np.array([item.embedding for item in response.data], dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return dict(zip(unique_texts, vectors))
+
+
+def _ad_group_labels(structure: List[Dict[str, Any]]) -> Tuple[List[Tuple[int, int]], List[str]]:
+    """Returns every ad group's (category index, ad group index) and its "category > ad group" label."""
+    ad_group_refs = []
+    ad_group_labels = []
+    for cat_idx, category in enumerate(structure):
+        for ag_idx, ad_group in enumerate(category.get("ad_groups", [])):
+            ad_group_refs.append((cat_idx, ag_idx))
+            ad_group_labels.append(f"{category.get('category_name', '')} > {ad_group.get('ad_group_name', '')}")
+    return ad_group_refs, ad_group_labels
+
+
+def prefetch_routing_embeddings(
+        keywords: List[str],
+        existing_structure: List[Dict[str, Any]]
+) -> Dict[str, np.ndarray]:
+    """
+    Embeds the keywords and the existing ad groups ahead of categorization, so
+    the call can overlap other work (e.g. the Google Ads filter request). Pass
+    the result to categorize_keywords_with_ai as `precomputed_vectors`.
+    """
+    return _embed_texts(list(keywords) + _ad_group_labels(existing_structure)[1])
+
+
+def _route_keywords_by_embedding(
+        scanned_keywords: List[str],
+        structure: List[Dict[str, Any]],
+        precomputed_vectors: Optional[Dict[str, np.ndarray]] = None
+) -> Tuple[Dict[Tuple[int, int], List[str]], List[str]]:
+    """
+    Embeds every existing ad group (as "category > ad group") together with the
+    new keywords in one batched call and assigns each keyword whose cosine
+    similarity to its nearest ad group passes ROUTING_SIMILARITY_THRESHOLD.
+    Texts already present in `precomputed_vectors` are not embedded again.
+
+    Returns the routed keywords keyed by (category index, ad group index) and
+    the list of keywords that still need the LLM.
+    """
+    ad_group_refs, ad_group_labels = _ad_group_labels(structure)
+
+    if not ad_group_refs:
+        return {}, list(scanned_keywords)
+
+    text_vectors = dict(precomputed_vectors or {})
+    text_vectors.update(_embed_texts([
+        text for text in ad_group_labels + list(scanned_keywords) if text not in text_vectors
+    ]))
+    group_vectors = np.array([text_vectors[label] for label in ad_group_labels])
+    keyword_vectors = np.array([text_vectors[keyword] for keyword in scanned_keywords])
+
+    similarities = keyword_vectors @ group_vectors.T
+    best_groups = similarities.argmax(axis=1)
+    best_scores = similarities[np.arange(len(scanned_keywords)), best_groups]
+
+    routed: Dict[Tuple[int, int], List[str]] = {}
+    unrouted = []
+    for keyword, group_idx, score in zip(scanned_keywords, best_groups, best_scores):
+        if score >= ROUTING_SIMILARITY_THRESHOLD:
+            routed.setdefault(ad_group_refs[group_idx], []).append(keyword)
+        else:
+            unrouted.append(keyword)
+    return routed, unrouted
+
+
+def _merge_assignments(
+        structure: List[Dict[str, Any]],
+        keywords: List[str],
+        assignments: List[Dict[str, Any]]
+) -> None:
+    """
+    Adds LLM-assigned keywords to the structure in place, creating categories
+    and ad groups by name as needed. Keywords the model left out are placed in
+    an "Uncategorized" category so none are lost.
+    """
+    categories_by_name = {c.get("category_name", "").strip().lower(): c for c in structure}
+    # The model may change a keyword's casing; match on lowercase and keep the original text
+    expected = {kw.strip().lower(): kw for kw in keywords}
+    placed = set()
+
+    def _place(keyword: str, category_name: str, ad_group_name: str) -> None:
+        category = categories_by_name.get(category_name.strip().lower())
+        if category is None:
+            category = {"category_name": category_name, "ad_groups": []}
+            structure.append(category)
+            categories_by_name[category_name.strip().lower()] = category
+        ad_groups = category.setdefault("ad_groups", [])
+        ad_group = next(
+            (ag for ag in ad_groups if ag.get("ad_group_name", "").strip().lower() == ad_group_name.strip().lower()),
+            None
+        )
+        if ad_group is None:
+            ad_group = {"ad_group_name": ad_group_name, "keywords": []}
+            ad_groups.append(ad_group)
+        ad_group_keywords = _ad_group_keywords(ad_group)
+        if keyword not in ad_group_keywords:
+            ad_group_keywords.append(keyword)
+        placed.add(keyword)
+
+    for assignment in assignments:
+        keyword = expected.get(str(assignment.get("keyword", "")).strip().lower())
+        if keyword is None or keyword in placed:
+            continue
+        _place(
+            keyword,
+            assignment.get("category_name") or UNCATEGORIZED_CATEGORY_NAME,
+            assignment.get("ad_group_name") or UNCATEGORIZED_CATEGORY_NAME
+        )
+
+    missing = [kw for kw in keywords if kw not in placed]
+    if missing:
+        logging.warning(f"⚠️ AI categorization skipped {len(missing)} keywords. Adding them to '{UNCATEGORIZED_CATEGORY_NAME}'.")
+        for keyword in missing:
+            _place(keyword, UNCATEGORIZED_CATEGORY_NAME, UNCATEGORIZED_CATEGORY_NAME)
+
+
+def _reassign_ids(structure: List[Dict[str, Any]]) -> None:
+    """Re-indexes category_id and (globally) ad_group_id sequentially from 1."""
+    ad_group_id = 1
+    for category_id, category in enumerate(structure, start=1):
+        category["category_id"] = category_id
+        for ad_group in category.get("ad_groups", []):
+            ad_group["ad_group_id"] = ad_group_id
+            ad_group_id += 1
+
+
 def categorize_keywords_with_ai(
         scanned_keywords: List[str],
-        existing_structure: List[Dict[str, Any]]
+        existing_structure: List[Dict[str, Any]],
+        precomputed_vectors: Optional[Dict[str, np.ndarray]] = None
 ) -> List[Dict[str, Any]]:
     """
-    Uses AI to categorize all keywords at once into the structured format,
-    ensuring no keywords are lost.
+    Categorizes new keywords into the structured format in two stages, ensuring
+    no keywords are lost:
+    1. Keywords that closely match an existing ad group are routed locally via embeddings.
+    2. Only the remaining keywords are sent to the LLM, which assigns them to
+       existing or new categories/ad groups.
+    The structure is updated incrementally and every category and ad group is re-ID'd.
+    Embeddings from `prefetch_routing_embeddings` can be passed as `precomputed_vectors` to skip
+    re-embedding those texts.
     """
     if not scanned_keywords:
         return existing_structure
 
-    # 🔑 PROMPT FIXES: Added SCORING STEP to prioritize new, distinct categories
-    prompt = (
-        "You are a meticulous data architect and marketing strategist. Your **primary and non-negotiable task** is to ensure **100% inclusion** of every single keyword from the `NEW KEYWORDS` list into the final structured output. If you omit any keyword, the output is invalid.\n\n"
-        "Your output **MUST** be a single JSON array that merges the existing categories with all new keywords, following these rules:\n\n"
-        "### Output Structure Mandates (Strict Schema)\n"
-        "**The entire output MUST be a single JSON array containing category objects.**\n"
-        "1. **Category IDs:** Every category object (existing or new) MUST have an integer **`category_id`**. IDs must be sequential, starting at 1.\n"
-        "2. **Ad Group IDs:** Every ad group object (existing or new) MUST have an integer **`ad_group_id`**. IDs must be sequential, starting at 1, across ALL ad groups.\n"
-        "3. **Recalculate All IDs:** You must re-index the **entire final structure**. Do not use the IDs from the `Existing Categories` list; assign new, sequential IDs to ALL categories and ALL ad groups in the final merged output.\n\n"
-        "### Categorization Rules\n"
-        "1. **SCORING/INITIAL STEP:** Before merging, first analyze the `NEW KEYWORDS` list and identify which keywords *must* be grouped into a new category because they do not relate to any existing category (e.g., 'Apple Products' vs 'Clothing').\n"
-        "2. **Existing Categories**: Add new keywords (if any fit) to the most relevant existing category and ad group. Create a new ad group if necessary.\n"
-        "3. **New Categories**: Create new, logical categories for all keywords identified in the SCORING/INITIAL STEP. Group related keywords into new ad groups within these categories as needed.\n\n"
-        "### Example of Desired Structure (Mandatory Schema)\n"
-        "**Use this exact object structure and ensure all IDs are present and sequentially updated:**\n"
-        "```json\n"
-        "[\n"
-        "  {\n"
-        "    \"category_id\": 1,\n"
-        "    \"category_name\": \"Example Category\",\n"
-        "    \"ad_groups\": [\n"
-        "      {\n"
-        "        \"ad_group_id\": 1,\n"
-        "        \"ad_group_name\": \"Example Group A (Existing)\",\n"
-        "        \"keywords\": [\"existing keyword\", \"new keyword merged here\"]\n"
-        "      }\n"
-        "    ]\n"
-        "  },\n"
-        "  {\n"
-        "    \"category_id\": 2,\n"
-        "    \"category_name\": \"Example Category\",\n"
-        "    \"ad_groups\": [\n"
-        "      {\n"
-        "        \"ad_group_id\": 2,\n"
-        "        \"ad_group_name\": \"Example Group A (Existing)\",\n"
-        "        \"keywords\": [\"new keyword merged here\"]\n"
-        "      }\n"
-        "    ]\n"
-        "  }, ...\n"
-        "]\n"
-        "```\n\n"
-        "--- (End of Schema)\n\n"
-        "**Existing Categories (for context):**\n"
-        f"{json.dumps(existing_structure, indent=2)}\n\n"
-        "**NEW KEYWORDS TO CATEGORIZE (READ THIS LIST CAREFULLY, your final output must include all these):**\n"
-        f"{json.dumps(scanned_keywords, indent=2)}\n\n"
-        "**Generate the complete, merged, and fully re-ID'd RAW JSON array that includes every single new keyword. Feel free to add new categories for the output to be very professional (and nothing else):**"
-    )
+    structure = copy.deepcopy(existing_structure)
 
     try:
-        # 🔑 FIX: Use response_format={"type": "json_object"} to force the API
-        # to guarantee syntactically valid JSON output.
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-            max_tokens=12000
-        )
+        routed, unrouted = _route_keywords_by_embedding(scanned_keywords, structure, precomputed_vectors)
+    except Exception as e:
+        logging.warning(f"⚠️ Embedding-based routing failed, sending all keywords to the LLM: {e}")
+        routed, unrouted = {}, list(scanned_keywords)
 
-        ai_output_text = response.choices[0].message.content.strip()
+    for (cat_idx, ag_idx), keywords in routed.items():
+        ad_group_keywords = _ad_group_keywords(structure[cat_idx]["ad_groups"][ag_idx])
+        ad_group_keywords.extend(kw for kw in keywords if kw not in ad_group_keywords)
 
+    logging.info(f"🧭 Routed {len(scanned_keywords) - len(unrouted)} keywords to existing ad groups locally; "
+                 f"{len(unrouted)} left for the LLM.")
 
-        json_string_clean = ai_output_text.replace('```json', '').replace('```', '').strip()
+    if unrouted:
+        category_outline = [
+            {
+                "category_name": category.get("category_name"),
+                "ad_groups": [ag.get("ad_group_name") for ag in category.get("ad_groups", [])]
+            }
+            for category in structure
+        ]
+        user_message = (
+            "**Existing Categories and Ad Groups (for context):**\n"
+            f"{_compact_json(category_outline)}\n\n"
+            "**NEW KEYWORDS TO CATEGORIZE (READ THIS LIST CAREFULLY, your output must include all these):**\n"
+            f"{_compact_json(unrouted)}\n\n"
+            "**Generate the RAW JSON object of assignments that includes every single new keyword:**"
+        )
 
-        ai_output = json.loads(json_string_clean)
-        return ai_output
+        try:
+            # 🔑 FIX: Use response_format={"type": "json_object"} to force the API
+            # to guarantee syntactically valid JSON output.
+            response = _create_chat_completion_sync(
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": CATEGORIZATION_SYSTEM_PROMPT},
+                    {"role": "user", "content": user_message},
+                ],
+                temperature=0.3,
+                max_tokens=4000,
+                response_format={"type": "json_object"},
+                timeout=CATEGORIZATION_TIMEOUT_SECONDS
+            )
 
-    except Exception as e:
-        # Keep the single general exception handler for any unexpected API or network issues.
-        logging.error(f"❌ An error occurred during AI categorization: {e}", exc_info=True)
-        return []
\ No newline at end of file
+            ai_output = json.loads(response.choices[0].message.content)
+            _merge_assignments(structure, unrouted, ai_output.get("assignments", []))
+
+        except Exception as e:
+            # Keep the single general exception handler for any unexpected API or network issues.
+            logging.error(f"❌ An error occurred during AI categorization: {e}", exc_info=True)
+            return []
+
+    _reassign_ids(structure)
+    return structure
@@ -2,6 +2,8 @@ import sys
 import os
 import json
 import logging
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Dict, Any
 
@@ -18,11 +20,35 @@ sys.path.insert(0, str(project_root))
 
 # Import the core components
 from core.web_scraper import WebScraper
-from core.ai_keyword_extractor import extract_keywords_from_scraped_text, categorize_keywords_with_ai
+from core.ai_keyword_extractor import (
+    extract_keywords_from_scraped_text,
+    extract_keywords_from_pages,
+    categorize_keywords_with_ai,
+    prefetch_routing_embeddings,
+)
 # Import the GoogleAdsProvider to use the new lightweight filtering method
 from core.data_provider.google_ads_provider import GoogleAdsProvider
 
 
+def _split_keywords(value: Any) -> List[str]:
+    """Turns a newline-separated keyword string into a clean list of keywords."""
+    # Assuming keywords might be a comma/newline separated string if stored oddly
+    return [k for k in (line.strip() for line in (value or '').split("\n")) if k]
+
+
+def _normalize_structure(existing_structure: List[Dict[str, Any]]) -> None:
+    """
+    Ensures every ad group's 'keywords' field is a list of strings, converting
+    newline-separated strings in place. Ad groups that already hold a list,
+    the common case, are only read once and left untouched.
+    """
+    for category in existing_structure:
+        for ad_group in category.get('ad_groups', ()):
+            keywords = ad_group.get('keywords')
+            if not isinstance(keywords, list):
+                ad_group['keywords'] = _split_keywords(keywords)
+
+
 def scan_website_for_keywords(
         start_url: str,
         existing_structure: List[Dict[str, Any]],
@@ -32,6 +58,8 @@ def scan_website_for_keywords(
         language_code: str = "1000",
         geo_target_id: str = "2840",
         headlines_only: bool = False,
+        use_batch_api: bool = False,
+        filter_with_ads: bool = True,
 ) -> List[Dict[str, Any]]:
     """
     Orchestrates the entire process of crawling a website, extracting keywords,
@@ -50,6 +78,11 @@ def scan_website_for_keywords(
         geo_target_id (str): Google Ads geo target ID for filtering.
         headlines_only (bool): If True, restricts the source text for keyword extraction
                           to only text contained within HTML header tags (h1-h6).
+        use_batch_api (bool): If True, keyword extraction is submitted through the
+                              OpenAI Batch API (half the cost, but can take much
+                              longer). Intended for offline / scheduled runs.
+        filter_with_ads (bool): If False, skips the Google Ads volume check and
+                                categorizes every extracted keyword.
 
     Returns:
         List[Dict[str, Any]]: The formatted data structure ready for merging,
@@ -62,77 +95,123 @@ def scan_website_for_keywords(
     logging.info(f"URL: {start_url}, Depth: {depth}, Max Pages: {max_pages}, Max Keywords: {max_keywords}")
     logging.info(f"Filter settings: Language={language_code}, Geo={geo_target_id}, Headlines Only: {headlines_only}")
 
-    # Step 1: Initialize and run the web scraper with max_pages limit
+    # Step 1: Initialize the web scraper with max_pages limit
     scraper = WebScraper()
-    try:
-        # PASS THE NEW 'headlines' PARAMETER TO THE SCRAPER
-        consolidated_text = scraper.scrape_website(start_url, depth, max_pages, headlines_only=headlines_only)
-        print(consolidated_text)
-        if not consolidated_text:
-            logging.error("❌ Scraping returned no text. Cannot proceed.")
+
+    if use_batch_api:
+        # The Batch API needs every request up front, so scrape everything first
+        try:
+            # PASS THE NEW 'headlines' PARAMETER TO THE SCRAPER
+            consolidated_text = scraper.scrape_website(start_url, depth, max_pages, headlines_only=headlines_only)
+            if not consolidated_text:
+                logging.error("❌ Scraping returned no text. Cannot proceed.")
+                return []
+        except Exception as e:
+            logging.error(f"❌ An error occurred during scraping: {e}", exc_info=True)
             return []
-    except Exception as e:
-        logging.error(f"❌ An error occurred during scraping: {e}", exc_info=True)
-        return []
 
-    logging.info(f"✅ Scraping complete. Total text size: {len(consolidated_text)} characters.")
+        logging.info(f"✅ Scraping complete. Total text size: {len(consolidated_text)} characters.")
 
-    # Step 2: Use the AI to extract a raw list of keywords from the scraped text
-    try:
-        suggested_keywords_raw = extract_keywords_from_scraped_text(consolidated_text, max_keywords)
-        if not suggested_keywords_raw:
-            logging.warning("⚠️ AI extraction found no relevant keywords.")
+        # Step 2: Use the AI to extract a raw list of keywords from the scraped text
+        try:
+            suggested_keywords_raw = extract_keywords_from_scraped_text(
+                consolidated_text, max_keywords, use_batch_api=True
+            )
+        except Exception as e:
+            logging.error(f"❌ An error occurred during AI extraction: {e}", exc_info=True)
             return []
-    except Exception as e:
-        logging.error(f"❌ An error occurred during AI extraction: {e}", exc_info=True)
+    else:
+        # Steps 1 + 2 pipelined: each page's text is sent for AI extraction as soon as
+        # it is scraped, so the LLM calls overlap with the rest of the crawl.
+        scraped_chars = 0
+
+        def _scraped_pages():
+            nonlocal scraped_chars
+            # Closing this generator closes iter_pages too, which cancels the crawl
+            with closing(scraper.iter_pages(start_url, depth, max_pages, headlines_only=headlines_only)) as pages:
+                for page_text in pages:
+                    scraped_chars += len(page_text)
+                    yield page_text
+
+        try:
+            suggested_keywords_raw = extract_keywords_from_pages(_scraped_pages(), max_keywords)
+        except Exception as e:
+            logging.error(f"❌ An error occurred during scraping or AI extraction: {e}", exc_info=True)
+            return []
+
+        if not scraped_chars:
+            logging.error("❌ Scraping returned no text. Cannot proceed.")
+            return []
+
+        logging.info(f"✅ Scraping complete. Total text size: {scraped_chars} characters.")
+
+    if not suggested_keywords_raw:
+        logging.warning("⚠️ AI extraction found no relevant keywords.")
         return []
 
+    # Canonicalize (case, stray whitespace) and dedup in order before the Google Ads
+    # filter and categorization, so near-duplicates cost neither an API row nor prompt tokens
+    suggested_keywords_raw = list(dict.fromkeys(
+        keyword for keyword in (" ".join(kw.split()).lower() for kw in suggested_keywords_raw) if keyword
+    ))
+
     logging.info(f"✅ Raw keyword extraction complete. Found {len(suggested_keywords_raw)} unique keywords.")
 
+    # Prepare the existing structure for the AI (ensure keywords are a list of strings)
+    _normalize_structure(existing_structure)
+
+    # The embeddings used to route keywords during categorization don't depend on
+    # the filter result, so fetch them for the raw keywords and the existing ad
+    # groups while the Google Ads filter request is in flight.
+    executor = ThreadPoolExecutor(max_workers=1)
+    embedding_future = executor.submit(prefetch_routing_embeddings, suggested_keywords_raw, existing_structure)
+    executor.shutdown(wait=False)
+
     # Step 2.5: Lightweight Keyword Quality Filtering using Google Ads API
-    try:
-        # Initialize provider (data=None is fine for the filter method)
-        google_ads_provider = GoogleAdsProvider(
-            data=[],
-            language_code=language_code,
-            geo_target_id=geo_target_id
-        )
+    if not filter_with_ads:
+        suggested_keywords_filtered = suggested_keywords_raw
+    else:
+        try:
+            # Initialize provider (data=None is fine for the filter method)
+            google_ads_provider = GoogleAdsProvider(
+                data=[],
+                language_code=language_code,
+                geo_target_id=geo_target_id
+            )
 
-        # Filter the raw list
-        suggested_keywords_filtered = google_ads_provider.filter_keywords_by_monthly_volume(
-            suggested_keywords_raw
-        )
+            # Filter the raw list
+            suggested_keywords_filtered = google_ads_provider.filter_keywords_by_monthly_volume(
+                suggested_keywords_raw
+            )
 
-        keywords_removed = len(suggested_keywords_raw) - len(suggested_keywords_filtered)
+            keywords_removed = len(suggested_keywords_raw) - len(suggested_keywords_filtered)
 
-        if keywords_removed > 0:
-            logging.info(f"🧹 Filter removed {keywords_removed} low-volume/invalid keywords.")
+            if keywords_removed > 0:
+                logging.info(f"🧹 Filter removed {keywords_removed} low-volume/invalid keywords.")
 
-        if not suggested_keywords_filtered:
-            logging.warning("⚠️ All keywords were filtered out by the volume check. Cannot proceed to categorization.")
-            return []
+            if not suggested_keywords_filtered:
+                logging.warning("⚠️ All keywords were filtered out by the volume check. Cannot proceed to categorization.")
+                return []
 
-    except Exception as e:
-        # Log the error but proceed with the raw list if filtering fails (safer than crashing)
-        logging.error(
-            f"⚠️ Failed to perform Google Ads keyword filtering. Proceeding with {len(suggested_keywords_raw)} raw keywords. Error: {e}",
-            exc_info=True)
-        suggested_keywords_filtered = suggested_keywords_raw
+        except Exception as e:
+            # Log the error but proceed with the raw list if filtering fails (safer than crashing)
+            logging.error(
+                f"⚠️ Failed to perform Google Ads keyword filtering. Proceeding with {len(suggested_keywords_raw)} raw keywords. Error: {e}",
+                exc_info=True)
+            suggested_keywords_filtered = suggested_keywords_raw
 
     # Step 3: Use the AI to categorize the clean list of keywords into the structured format
     try:
-        # Prepare the existing structure for the AI (ensure keywords are a list of strings)
-        new_existing_structure = existing_structure
-        for category in new_existing_structure:
-            for ad_group in category.get('ad_groups', []):
-                # Ensure the 'keywords' field is handled correctly before passing to the AI
-                if type(ad_group.get('keywords')) is not list:
-                    # Assuming keywords might be a comma/newline separated string if stored oddly
-                    keywords_list = ad_group.get('keywords', '').split("\n")
-                    ad_group['keywords'] = [k.strip() for k in keywords_list if k.strip()]
+        try:
+            precomputed_vectors = embedding_future.result()
+        except Exception as e:
+            logging.warning(f"⚠️ Prefetching keyword embeddings failed, categorization will embed them itself: {e}")
+            precomputed_vectors = None
 
         # Pass the FILTERED list to the AI
-        categorized_structure = categorize_keywords_with_ai(suggested_keywords_filtered, new_existing_structure)
+        categorized_structure = categorize_keywords_with_ai(
+            suggested_keywords_filtered, existing_structure, precomputed_vectors
+        )
 
     except Exception as e:
         logging.error(f"❌ An error occurred during AI categorization: {e}", exc_info=True)
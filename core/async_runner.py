@@ -0,0 +1,50 @@
+import asyncio
+import atexit
+import threading
+from typing import Any, Coroutine, Optional, TypeVar
+
+try:
+    import uvloop
+except ImportError:
+    # uvloop is optional (and unavailable on Windows); fall back to the stdlib loop.
+    uvloop = None
+
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Returns the shared background event loop, starting it on first use.
+
+    All async fan-outs run on this single long-lived loop so that module-level
+    async clients (and their pooled connections) stay bound to one loop for the
+    whole process instead of breaking when a per-call `asyncio.run` loop closes.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = uvloop.new_event_loop() if uvloop is not None else asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="async-runner", daemon=True)
+            thread.start()
+        return _loop
+
+
+def run_sync(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Runs a coroutine on the shared background loop and blocks until it finishes.
+    Safe to call from synchronous code, including Streamlit script threads.
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+    return future.result()
+
+
+def _shutdown_loop():
+    """Stops the background loop at interpreter exit."""
+    if _loop is not None and _loop.is_running():
+        _loop.call_soon_threadsafe(_loop.stop)
+
+
+atexit.register(_shutdown_loop)
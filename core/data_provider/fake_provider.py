@@ -1,7 +1,55 @@
-import random
 from typing import Dict, List, Any, Optional
 from datetime import datetime
+
+import numpy as np
+
 from .base import KeywordDataProvider
+from .jit import njit
+
+# Three full years of history plus the current year
+HISTORY_YEARS = 4
+
+
+@njit(cache=True)
+def _apply_1mo_boost_kernel(matrix, month_index, boost):
+    """
+    In-place 1-month boost on a (years, 12) volume matrix: last year's next
+    month becomes `boost`% higher than the same year's current month.
+    """
+    j = month_index + 1
+    if j >= 12:
+        return  # can't go beyond December
+
+    last_year = matrix.shape[0] - 2  # current year is the last row
+    base = matrix[last_year, month_index]
+    if base == 0:
+        base = np.random.randint(10, 101)
+        matrix[last_year, month_index] = base
+
+    matrix[last_year, j] = int(base * (1 + boost))
+
+
+@njit(cache=True)
+def _apply_3mo_boost_kernel(matrix, month_index, boost):
+    """
+    In-place 3-month boost on a (years, 12) volume matrix: in every year but
+    the current one, the next 3 months average `boost`% above the current month.
+    """
+    if month_index + 3 >= 12:
+        return  # would overflow months
+
+    for year in range(matrix.shape[0] - 1):  # exclude current year
+        base = matrix[year, month_index]
+        if base == 0:
+            base = np.random.randint(10, 101)
+            matrix[year, month_index] = base
+
+        target_avg = base * (1 + boost)
+
+        for j in range(month_index + 1, month_index + 4):
+            # Add a bit of variance while keeping average close to target
+            fluctuation = np.random.uniform(-0.1, 0.1)
+            matrix[year, j] = int(target_avg * (1 + fluctuation))
 
 
 class FakeProvider(KeywordDataProvider):
@@ -14,88 +62,102 @@ class FakeProvider(KeywordDataProvider):
         self.data = data
         self.month_index = month_index if month_index is not None else datetime.now().month - 1
         self.boosts = manual_trend_boosts or {}
+        self._rng = np.random.default_rng()
+        # Generated histories, reused so repeated lookups of a keyword are stable.
+        # Left unused when boosts are configured, so boosted runs stay random.
+        self._cache: Dict[str, Dict[int, List[int]]] = {}
+
+    def invalidate_cache(self, keyword: str) -> None:
+        """Drops the cached history of a keyword so the next lookup regenerates it."""
+        self._cache.pop(keyword, None)
+
+    def clear_cache(self) -> None:
+        """Drops every cached history."""
+        self._cache.clear()
+
+    def _random_volume_matrices(self, count: int, current_month: int) -> np.ndarray:
+        """
+        Draws random monthly volumes for `count` keywords in one vectorized call.
+        Returns an array of shape (count, years, 12); months after the current
+        one in the current year are zeroed.
+        """
+        matrices = self._rng.integers(0, 151, size=(count, HISTORY_YEARS, 12), dtype=np.int32)
+        matrices[:, -1, current_month:] = 0
+        return matrices
 
     def get_monthly_volumes_by_year(self, keyword: str) -> Dict[int, List[int]]:
-        current_year = datetime.now().year
-        current_month = datetime.now().month
-        start_year = current_year - 3
-        volumes = {}
-
-        # Step 1: generate random data
-        for year in range(start_year, current_year + 1):
-            if year == current_year:
-                months = [random.randint(0, 150) for _ in range(current_month)]
-                months.extend([0] * (12 - current_month))
-            else:
-                months = [random.randint(0, 150) for _ in range(12)]
-            volumes[year] = months
-
-        # Step 2: apply boosts if needed
+        if keyword in self._cache:
+            return self._cache[keyword]
+        now = datetime.now()
+        matrix = self._random_volume_matrices(1, now.month)[0]
+        self._apply_boosts(keyword, matrix)
+        volumes = self._to_year_dict(matrix.tolist(), now.year - (HISTORY_YEARS - 1))
+        if not self.boosts:
+            self._cache[keyword] = volumes
+        return volumes
+
+    def _apply_boosts(self, keyword: str, matrix: np.ndarray):
+        """Applies the keyword's manual boost, if any, to its (years, 12) volume matrix in place."""
         if keyword in self.boosts:
             boost_info = self.boosts[keyword]
             if "1mo" in boost_info:
-                self._apply_1mo_boost(volumes, boost_info["1mo"])
+                self._apply_1mo_boost(matrix, boost_info["1mo"])
             elif "3mo" in boost_info:
-                self._apply_3mo_boost(volumes, boost_info["3mo"])
+                self._apply_3mo_boost(matrix, boost_info["3mo"])
 
-        return volumes
+    @staticmethod
+    def _to_year_dict(months_by_year: List[List[int]], start_year: int) -> Dict[int, List[int]]:
+        """Converts one keyword's per-year month lists into the {year: [...]} format."""
+        return {start_year + offset: months for offset, months in enumerate(months_by_year)}
 
-    def _apply_1mo_boost(self, volumes: Dict[int, List[int]], boost: float):
+    def _apply_1mo_boost(self, matrix: np.ndarray, boost: float):
         """
         Ensures that last year's next month is `boost`% higher than the same year's current month.
         """
-        years = sorted(volumes.keys())
-        last_year = years[-2]  # current year is last element
-        i = self.month_index
-        j = i + 1
-
-        if j >= 12:
-            return  # can't go beyond December
-
-        base = volumes[last_year][i]
-        if base == 0:
-            base = random.randint(10, 100)
-            volumes[last_year][i] = base
-
-        volumes[last_year][j] = int(base * (1 + boost))
+        _apply_1mo_boost_kernel(matrix, self.month_index, boost)
 
-    def _apply_3mo_boost(self, volumes: Dict[int, List[int]], boost: float):
+    def _apply_3mo_boost(self, matrix: np.ndarray, boost: float):
         """
         Ensures that next 3 months average in each of the last 3 years
         is `boost`% higher than that same year's current month.
         """
-        years = sorted(volumes.keys())[:-1]  # exclude current year
-        i = self.month_index
-        j_range = [i + 1, i + 2, i + 3]
-
-        if max(j_range) >= 12:
-            return  # would overflow months
-
-        for year in years:
-            base = volumes[year][i]
-            if base == 0:
-                base = random.randint(10, 100)
-                volumes[year][i] = base
-
-            target_avg = base * (1 + boost)
-
-            for j in j_range:
-                # Add a bit of variance while keeping average close to target
-                fluctuation = random.uniform(-0.1, 0.1)
-                volumes[year][j] = int(target_avg * (1 + fluctuation))
+        _apply_3mo_boost_kernel(matrix, self.month_index, boost)
 
     def generate_fake_output(self) -> List[Dict[str, Any]]:
         output = []
 
+        # Generate each unique keyword once, drawing all of their volumes in a
+        # single RNG call, so keywords shared between entries get the same trend.
+        unique_keywords = list(dict.fromkeys(
+            kw
+            for entry in self.data
+            for kw in (entry["keyword"], *entry.get("similar_keywords", []))
+            if kw not in self._cache
+        ))
+        now = datetime.now()
+        start_year = now.year - (HISTORY_YEARS - 1)
+        matrices = self._random_volume_matrices(len(unique_keywords), now.month)
+
+        # Only the boosted keywords' rows need touching before the single
+        # conversion of the whole tensor to Python lists.
+        for index, kw in enumerate(unique_keywords):
+            if kw in self.boosts:
+                self._apply_boosts(kw, matrices[index])
+
+        trends = {
+            kw: self._to_year_dict(months_by_year, start_year)
+            for kw, months_by_year in zip(unique_keywords, matrices.tolist())
+        }
+        if not self.boosts:
+            self._cache.update(trends)
+            trends = self._cache
+
         for entry in self.data:
             keyword = entry["keyword"]
             similar_keywords = entry.get("similar_keywords", [])
 
-            keyword_trend = self.get_monthly_volumes_by_year(keyword)
-            similar_trends = {
-                kw: self.get_monthly_volumes_by_year(kw)
-                for kw in similar_keywords
-            }
+            keyword_trend = trends[keyword]
+            similar_trends = {kw: trends[kw] for kw in similar_keywords}
 
             output.append({
                 "keyword": keyword,
@@ -1,22 +1,236 @@
 import os
 import sys
+import copy
+import json
+import logging
+import sqlite3
 import time
 import random
+import threading
+import functools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 from datetime import datetime
-from dateutil.relativedelta import relativedelta
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional; without it payloads are encoded with the stdlib json module.
+    orjson = None
 
 # Add the project root to sys.path to access settings
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 from .base import KeywordDataProvider
+from .jit import njit, NUMBA_AVAILABLE
 from config import settings
 
-from google.ads.googleads.client import GoogleAdsClient
-from google.ads.googleads.errors import GoogleAdsException
-from google.api_core.exceptions import ResourceExhausted
+logger = logging.getLogger(__name__)
+
+# The google-ads package is heavy to import, so it is loaded on the first
+# GoogleAdsProvider construction (see _import_google_ads) rather than whenever
+# this module is imported.
+GoogleAdsClient = None
+GoogleAdsException = None
+ResourceExhausted = None
+
+# Default upper bound on Google Ads requests in flight at once in generate_output
+MAX_CONCURRENT_REQUESTS = 8
+
+# Keywords sent per GenerateKeywordHistoricalMetrics request (the API accepts up to 10,000)
+HISTORICAL_METRICS_BATCH_SIZE = 1000
+
+# Retry policy for rate-limited requests: decorrelated-jitter backoff starting at
+# RATE_LIMIT_BASE_DELAY_SECONDS and never sleeping longer than RATE_LIMIT_MAX_DELAY_SECONDS
+RATE_LIMIT_MAX_RETRIES = 5
+RATE_LIMIT_BASE_DELAY_SECONDS = 4
+RATE_LIMIT_MAX_DELAY_SECONDS = 30
+
+# LRU cache of fetched trend histories, shared by all provider instances so that
+# re-scanning the same keywords does not repeat API requests. Keys include the
+# language, geo target and current month, so a new month fetches fresh data.
+TREND_CACHE_MAXSIZE = 10000
+_trend_cache: "OrderedDict[tuple, Dict[str, List[int]]]" = OrderedDict()
+_trend_cache_lock = threading.Lock()
+
+# Trend histories also persist on disk (SQLite) so separate runs - the dashboard
+# and the monthly notifier - share fetched data. Entries expire after a week since
+# the current month's volumes are still being updated by Google.
+TREND_DISK_CACHE_PATH = project_root / ".gads_cache.sqlite3"
+TREND_DISK_CACHE_TTL_SECONDS = 7 * 24 * 3600
+_disk_cache_conn: Optional[sqlite3.Connection] = None
+_disk_cache_lock = threading.Lock()
+
+# get_campaign_data results, reused for a short while (keyed by customer ID)
+CAMPAIGN_CACHE_TTL_SECONDS = 15 * 60
+_campaign_cache: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
+
+
+@njit(cache=True)
+def _decode_monthly_volumes(result_indices, year_offsets, month_enums, searches, month_lookup, volumes, has_data):
+    """
+    Writes flattened (result, year offset, month enum, searches) rows into the
+    preallocated (results, years, 12) `volumes` tensor and marks the years seen
+    in `has_data`. Rows with an unknown month or an out-of-range year are
+    skipped; returns how many were skipped.
+    """
+    n_years = volumes.shape[1]
+    skipped = 0
+    for i in range(result_indices.size):
+        row = year_offsets[i]
+        month_enum = month_enums[i]
+        month_index = month_lookup[month_enum] if 0 <= month_enum < month_lookup.size else -1
+        if month_index >= 0 and 0 <= row < n_years:
+            volumes[result_indices[i], row, month_index] = searches[i]
+            has_data[result_indices[i], row] = True
+        else:
+            skipped += 1
+    return skipped
+
+
+def _decode_monthly_volumes_numpy(result_indices, year_offsets, month_enums, searches, month_lookup, volumes, has_data):
+    """Vectorized NumPy version of `_decode_monthly_volumes`, used when Numba isn't installed."""
+    known_enum = (month_enums >= 0) & (month_enums < month_lookup.size)
+    month_indices = np.where(known_enum, month_lookup[np.where(known_enum, month_enums, 0)], -1)
+    valid = (month_indices >= 0) & (year_offsets >= 0) & (year_offsets < volumes.shape[1])
+    volumes[result_indices[valid], year_offsets[valid], month_indices[valid]] = searches[valid]
+    has_data[result_indices[valid], year_offsets[valid]] = True
+    return int(valid.size - np.count_nonzero(valid))
+
+
+# Numba compiles the row loop; without it the loop is far slower than NumPy.
+_decode_volumes = _decode_monthly_volumes if NUMBA_AVAILABLE else _decode_monthly_volumes_numpy
+
+
+def _normalize_keyword(keyword: str) -> str:
+    """Lower-cases a keyword and collapses its whitespace, for matching API results to requests."""
+    return " ".join(keyword.lower().split())
+
+
+def _import_google_ads() -> None:
+    """Imports the Google Ads client and exception classes on first use."""
+    global GoogleAdsClient, GoogleAdsException, ResourceExhausted
+    if GoogleAdsClient is not None:
+        return
+    from google.ads.googleads.client import GoogleAdsClient as client_cls
+    from google.ads.googleads.errors import GoogleAdsException as ads_exception_cls
+    from google.api_core.exceptions import ResourceExhausted as resource_exhausted_cls
+    GoogleAdsException, ResourceExhausted = ads_exception_cls, resource_exhausted_cls
+    GoogleAdsClient = client_cls
+
+
+def _disk_cache_connection() -> sqlite3.Connection:
+    """Opens the on-disk trend cache on first use. Callers must hold _disk_cache_lock."""
+    global _disk_cache_conn
+    if _disk_cache_conn is None:
+        _disk_cache_conn = sqlite3.connect(str(TREND_DISK_CACHE_PATH), check_same_thread=False)
+        _disk_cache_conn.execute(
+            "CREATE TABLE IF NOT EXISTS trend_history ("
+            "cache_key TEXT PRIMARY KEY, trend_data TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+    return _disk_cache_conn
+
+
+def _disk_cache_get_many(cache_keys: List[str]) -> Dict[str, Dict[str, List[int]]]:
+    """Returns the unexpired on-disk entries among `cache_keys`."""
+    found = {}
+    try:
+        with _disk_cache_lock:
+            conn = _disk_cache_connection()
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(cache_keys), 500):
+                chunk = cache_keys[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT cache_key, trend_data FROM trend_history "
+                    f"WHERE expires_at > ? AND cache_key IN ({','.join('?' * len(chunk))})",
+                    [time.time(), *chunk]
+                )
+                found.update((cache_key, _loads_json(trend_data)) for cache_key, trend_data in rows)
+    except sqlite3.Error as e:
+        logger.warning(f"Trend disk cache read failed: {e}")
+    return found
+
+
+def _disk_cache_put_many(entries: Dict[str, Dict[str, List[int]]]) -> None:
+    """Writes trend histories to the on-disk cache."""
+    expires_at = time.time() + TREND_DISK_CACHE_TTL_SECONDS
+    try:
+        with _disk_cache_lock:
+            conn = _disk_cache_connection()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO trend_history (cache_key, trend_data, expires_at) VALUES (?, ?, ?)",
+                    [(cache_key, _dumps_json(trend_data), expires_at) for cache_key, trend_data in entries.items()]
+                )
+    except sqlite3.Error as e:
+        logger.warning(f"Trend disk cache write failed: {e}")
+
+
+def _disk_cache_delete(cache_key: Optional[str] = None) -> None:
+    """Deletes one on-disk entry, or all of them when no key is given."""
+    try:
+        with _disk_cache_lock:
+            conn = _disk_cache_connection()
+            with conn:
+                if cache_key is None:
+                    conn.execute("DELETE FROM trend_history")
+                else:
+                    conn.execute("DELETE FROM trend_history WHERE cache_key = ?", (cache_key,))
+    except sqlite3.Error as e:
+        logger.warning(f"Trend disk cache delete failed: {e}")
+
+
+@functools.lru_cache(maxsize=4)
+def _load_google_ads_client(developer_token: str, client_id: str, client_secret: str, refresh_token: str,
+                            login_customer_id: str) -> "GoogleAdsClient":
+    """
+    Creates a GoogleAdsClient for the given credentials, memoized so that every
+    provider instance with the same configuration shares one client and gRPC channel.
+    """
+    config = {
+        "developer_token": developer_token,
+        "client_id": client_id,
+        "client_secret": client_secret,
+        "refresh_token": refresh_token,
+        "login_customer_id": login_customer_id,
+        "use_proto_plus": True
+    }
+    return GoogleAdsClient.load_from_dict(config)
+
+
+def _dumps_json(obj: Any) -> bytes:
+    """Serializes obj to compact JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def _loads_json(data) -> Any:
+    """Parses JSON from bytes or str, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _gaql_string(value: str) -> str:
+    """Quotes value as a GAQL string literal, escaping backslashes and single quotes."""
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def _next_backoff(last_sleep: float) -> float:
+    """Returns the next decorrelated-jitter sleep time, capped at RATE_LIMIT_MAX_DELAY_SECONDS."""
+    return min(RATE_LIMIT_MAX_DELAY_SECONDS, random.uniform(RATE_LIMIT_BASE_DELAY_SECONDS, last_sleep * 3))
+
+
+def _shift_month(year: int, month: int, months: int) -> Tuple[int, int]:
+    """Returns the (year, month) that lies `months` months after (or before, if negative) the given one."""
+    total = year * 12 + (month - 1) + months
+    return total // 12, total % 12 + 1
 
 
 class GoogleAdsProvider(KeywordDataProvider):
@@ -26,32 +240,79 @@ class GoogleAdsProvider(KeywordDataProvider):
 
     def __init__(self, data: List[Dict[str, Any]],
                  language_code: str = "1000",
-                 geo_target_id: str = "2840"):
+                 geo_target_id: str = "2840",
+                 max_workers: int = MAX_CONCURRENT_REQUESTS):
         # The 'data' now represents a nested list of categories, ad groups, and keywords
         self.data = data
         self.client = self._get_google_ads_client()
         self.keyword_plan_service = self.client.get_service("KeywordPlanIdeaService")
+        self.ga_service = self.client.get_service("GoogleAdsService")
+        self.label_service = self.client.get_service("LabelService")
+        self.campaign_label_service = self.client.get_service("CampaignLabelService")
         self.customer_id = settings.GOOGLE_CUSTOMER_ID
         self.language_code = language_code
         self.geo_target_id = geo_target_id
+        # Upper bound on concurrent API requests in generate_output
+        self.max_workers = max_workers
+        # Resource names and message classes used by every request, resolved once
+        self._language_resource = f"languageConstants/{language_code}"
+        self._geo_target_resource = f"geoTargetConstants/{geo_target_id}"
+        self._historical_metrics_request_cls = type(self.client.get_type("GenerateKeywordHistoricalMetricsRequest"))
+        self._historical_metrics_options_cls = type(self.client.get_type("HistoricalMetricsOptions"))
+        self._keyword_ideas_request_cls = type(self.client.get_type("GenerateKeywordIdeasRequest"))
+        self._label_operation_cls = type(self.client.get_type("LabelOperation"))
+        self._campaign_label_operation_cls = type(self.client.get_type("CampaignLabelOperation"))
+        self._mutate_campaign_labels_request_cls = type(self.client.get_type("MutateCampaignLabelsRequest"))
+        self._google_ads_failure_cls = type(self.client.get_type("GoogleAdsFailure"))
+        # Month ranges for the requests, computed once as (year, month) pairs
+        today = datetime.now()
+        self._history_end = (today.year, today.month)
+        # Fetch 3 full years of data + some of the current year
+        self._history_start = _shift_month(today.year, today.month, -43)
+        self._filter_start = _shift_month(today.year, today.month, -1)
+
+        self._request_templates = threading.local()
+        self._quota_exhausted_code = self.client.enums.QuotaErrorEnum.RESOURCE_TEMPORARILY_EXHAUSTED
+
+        # Map month enums to 0-based indices once; the enum values never change
+        # after the client is created.
+        month_enum = self.client.enums.MonthOfYearEnum
+        self._month_to_index = {
+            month_enum.JANUARY: 0,
+            month_enum.FEBRUARY: 1,
+            month_enum.MARCH: 2,
+            month_enum.APRIL: 3,
+            month_enum.MAY: 4,
+            month_enum.JUNE: 5,
+            month_enum.JULY: 6,
+            month_enum.AUGUST: 7,
+            month_enum.SEPTEMBER: 8,
+            month_enum.OCTOBER: 9,
+            month_enum.NOVEMBER: 10,
+            month_enum.DECEMBER: 11,
+        }
+        # The same table as an array indexed by the enum's integer value (-1 = not a month),
+        # for use inside the compiled response decoder
+        self._month_lookup = np.full(max(int(e) for e in self._month_to_index) + 1, -1, dtype=np.int64)
+        for month, index in self._month_to_index.items():
+            self._month_lookup[int(month)] = index
 
-    def _get_google_ads_client(self) -> GoogleAdsClient:
+    def _get_google_ads_client(self) -> "GoogleAdsClient":
         """
-        Initializes and returns a GoogleAdsClient instance using environment variables,
-        with an explicit setting for use_proto_plus.
+        Returns the shared GoogleAdsClient for the credentials in the environment
+        variables, creating it on first use.
         """
+        _import_google_ads()
         try:
-            config = {
-                "developer_token": settings.GOOGLE_DEVELOPER_TOKEN,
-                "client_id": settings.GOOGLE_CLIENT_ID,
-                "client_secret": settings.GOOGLE_CLIENT_SECRET,
-                "refresh_token": settings.GOOGLE_REFRESH_TOKEN,
-                "login_customer_id": settings.GOOGLE_LOGIN_CUSTOMER_ID,
-                "use_proto_plus": True
-            }
-            return GoogleAdsClient.load_from_dict(config)
+            return _load_google_ads_client(
+                settings.GOOGLE_DEVELOPER_TOKEN,
+                settings.GOOGLE_CLIENT_ID,
+                settings.GOOGLE_CLIENT_SECRET,
+                settings.GOOGLE_REFRESH_TOKEN,
+                settings.GOOGLE_LOGIN_CUSTOMER_ID,
+            )
         except GoogleAdsException as e:
-            print(f"Error initializing Google Ads client: {e}")
+            logger.error(f"Error initializing Google Ads client: {e}")
             raise
 
     def _retry_on_rate_limit(self, func, *args, **kwargs):
@@ -59,27 +320,27 @@ class GoogleAdsProvider(KeywordDataProvider):
         A simple retry mechanism with exponential backoff for rate-limiting errors.
         This handles the specific RESOURCE_EXHAUSTED error code from the API.
         """
-        max_retries = 5
-        base_delay_seconds = 4
+        max_retries = RATE_LIMIT_MAX_RETRIES
         retry_count = 0
         last_exception = None
+        sleep_time = RATE_LIMIT_BASE_DELAY_SECONDS
 
         while retry_count < max_retries:
             try:
                 return func(*args, **kwargs)
             except GoogleAdsException as ex:
                 last_exception = ex
-                is_rate_limit_error = False
-                for error in ex.failure.errors:
-                    # Correct and robust way to check for quota error across different library versions
-                    if hasattr(error.error_code, 'quota_error') and \
-                            error.error_code.quota_error == self.client.enums.QuotaErrorEnum.RESOURCE_TEMPORARILY_EXHAUSTED:
-                        is_rate_limit_error = True
-                        break
+                # Only errors whose error_code oneof is set to quota_error can be rate limits;
+                # proto-plus `in` checks field presence without materializing the sub-message.
+                is_rate_limit_error = any(
+                    "quota_error" in error.error_code
+                    and error.error_code.quota_error == self._quota_exhausted_code
+                    for error in ex.failure.errors
+                )
 
                 if is_rate_limit_error:
-                    sleep_time = (base_delay_seconds * (2 ** retry_count)) + random.uniform(0, 1)
-                    print(
+                    sleep_time = _next_backoff(sleep_time)
+                    logger.warning(
                         f"Encountered a rate-limit error. Retrying in {sleep_time:.2f} seconds... "
                         f"(Attempt {retry_count + 1}/{max_retries})"
                     )
@@ -90,8 +351,8 @@ class GoogleAdsProvider(KeywordDataProvider):
                     raise
             except ResourceExhausted as ex:
                 last_exception = ex
-                sleep_time = (base_delay_seconds * (2 ** retry_count)) + random.uniform(0, 1)
-                print(
+                sleep_time = _next_backoff(sleep_time)
+                logger.warning(
                     f"Encountered a gRPC ResourceExhausted error. Retrying in {sleep_time:.2f} seconds... "
                     f"(Attempt {retry_count + 1}/{max_retries})"
                 )
@@ -105,47 +366,136 @@ class GoogleAdsProvider(KeywordDataProvider):
             # Should not be reachable, but as a fallback
             raise Exception("Retry mechanism failed without catching an exception.")
 
-    def get_monthly_volumes_by_year(self, keyword: str) -> Dict[str, List[int]]:
+    def _build_historical_metrics_request(self, start: Tuple[int, int], end: Tuple[int, int]):
         """
-        Fetches historical monthly search volume for a single keyword and formats it.
+        Builds a GenerateKeywordHistoricalMetricsRequest (without keywords) for the given
+        (year, month) range, using the message classes and resource names cached at init.
         """
-        request = self.client.get_type("GenerateKeywordHistoricalMetricsRequest")
+        request = self._historical_metrics_request_cls()
         request.customer_id = self.customer_id
-        request.keywords = [keyword]
-
-        # Use a dictionary to map month enums to 0-based indices for robustness
-        month_to_index = {
-            self.client.enums.MonthOfYearEnum.JANUARY: 0,
-            self.client.enums.MonthOfYearEnum.FEBRUARY: 1,
-            self.client.enums.MonthOfYearEnum.MARCH: 2,
-            self.client.enums.MonthOfYearEnum.APRIL: 3,
-            self.client.enums.MonthOfYearEnum.MAY: 4,
-            self.client.enums.MonthOfYearEnum.JUNE: 5,
-            self.client.enums.MonthOfYearEnum.JULY: 6,
-            self.client.enums.MonthOfYearEnum.AUGUST: 7,
-            self.client.enums.MonthOfYearEnum.SEPTEMBER: 8,
-            self.client.enums.MonthOfYearEnum.OCTOBER: 9,
-            self.client.enums.MonthOfYearEnum.NOVEMBER: 10,
-            self.client.enums.MonthOfYearEnum.DECEMBER: 11,
-        }
 
         # Set language and location dynamically
-        request.language = f"languageConstants/{self.language_code}"
-        request.geo_target_constants.append(f"geoTargetConstants/{self.geo_target_id}")
+        request.language = self._language_resource
+        request.geo_target_constants.append(self._geo_target_resource)
 
-        historical_metrics_options = self.client.get_type("HistoricalMetricsOptions")
+        historical_metrics_options = self._historical_metrics_options_cls()
+        historical_metrics_options.year_month_range.start.year = start[0]
+        historical_metrics_options.year_month_range.start.month = start[1]
+        historical_metrics_options.year_month_range.end.year = end[0]
+        historical_metrics_options.year_month_range.end.month = end[1]
 
-        today = datetime.now()
-        end_date = today.replace(day=1)
-        # Fetch 3 full years of data + some of the current year
-        start_date = end_date - relativedelta(months=43)
+        request.historical_metrics_options = historical_metrics_options
+        return request
 
-        historical_metrics_options.year_month_range.start.year = start_date.year
-        historical_metrics_options.year_month_range.start.month = start_date.month
-        historical_metrics_options.year_month_range.end.year = end_date.year
-        historical_metrics_options.year_month_range.end.month = end_date.month
+    def _historical_metrics_request(self, keywords: List[str], start: Tuple[int, int], end: Tuple[int, int]):
+        """
+        Returns a historical-metrics request for the keywords and range. The request
+        for each range is built once per thread and reused with only its keywords
+        replaced; keeping the templates per thread makes reuse safe under the
+        generate_output thread pool.
+        """
+        templates = getattr(self._request_templates, "by_range", None)
+        if templates is None:
+            templates = self._request_templates.by_range = {}
+        request = templates.get((start, end))
+        if request is None:
+            request = templates[(start, end)] = self._build_historical_metrics_request(start, end)
+        request.keywords = keywords
+        return request
 
-        request.historical_metrics_options = historical_metrics_options
+    def get_monthly_volumes_by_year(self, keyword: str) -> Dict[str, List[int]]:
+        """
+        Fetches historical monthly search volume for a single keyword and formats it.
+        """
+        return self.get_monthly_volumes_by_year_batch([keyword]).get(keyword, {})
+
+    def _trend_cache_key(self, keyword: str) -> tuple:
+        """Cache key for a keyword's trend history under this provider's settings."""
+        return keyword, self.language_code, self.geo_target_id, self._history_end
+
+    @staticmethod
+    def _disk_cache_key(cache_key: tuple) -> str:
+        """The on-disk form of an in-memory cache key."""
+        return json.dumps(cache_key)
+
+    def invalidate_cache(self, keyword: str) -> None:
+        """Drops the cached trend history of a keyword so the next lookup refetches it."""
+        cache_key = self._trend_cache_key(keyword)
+        with _trend_cache_lock:
+            _trend_cache.pop(cache_key, None)
+        _disk_cache_delete(self._disk_cache_key(cache_key))
+
+    @staticmethod
+    def clear_cache() -> None:
+        """Drops every cached trend history and campaign listing."""
+        with _trend_cache_lock:
+            _trend_cache.clear()
+        _disk_cache_delete()
+        _campaign_cache.clear()
+
+    @staticmethod
+    def clear_campaign_cache() -> None:
+        """Drops the cached campaign listings so the next get_campaign_data call refetches them."""
+        _campaign_cache.clear()
+
+    @staticmethod
+    def _store_in_memory_cache(entries: Dict[tuple, Dict[str, List[int]]]) -> None:
+        """Adds trend histories to the in-memory LRU, evicting the oldest beyond its size."""
+        with _trend_cache_lock:
+            _trend_cache.update(entries)
+            for cache_key in entries:
+                _trend_cache.move_to_end(cache_key)
+            while len(_trend_cache) > TREND_CACHE_MAXSIZE:
+                _trend_cache.popitem(last=False)
+
+    def get_monthly_volumes_by_year_batch(self, keywords: List[str]) -> Dict[str, Dict[str, List[int]]]:
+        """
+        Fetches historical monthly search volume for many keywords in a single
+        request and formats it per keyword.
+
+        Args:
+            keywords: The keywords to fetch. Callers should keep this at or below
+                      HISTORICAL_METRICS_BATCH_SIZE.
+
+        Returns:
+            A dictionary mapping each requested keyword to its {year: [12 volumes]}
+            history. Keywords without data map to an empty dictionary.
+        """
+        if not keywords:
+            return {}
+
+        # Serve what we can from the cache and only request the rest
+        volumes_by_keyword = {}
+        missing_keywords = []
+        with _trend_cache_lock:
+            for keyword in keywords:
+                cache_key = self._trend_cache_key(keyword)
+                if cache_key in _trend_cache:
+                    _trend_cache.move_to_end(cache_key)
+                    volumes_by_keyword[keyword] = _trend_cache[cache_key]
+                else:
+                    missing_keywords.append(keyword)
+
+        if not missing_keywords:
+            return volumes_by_keyword
+
+        # Then the on-disk cache, promoting hits into memory
+        disk_keys = {self._disk_cache_key(self._trend_cache_key(keyword)): keyword for keyword in missing_keywords}
+        disk_hits = _disk_cache_get_many(list(disk_keys))
+        if disk_hits:
+            hits_by_keyword = {disk_keys[disk_key]: trend_data for disk_key, trend_data in disk_hits.items()}
+            self._store_in_memory_cache({
+                self._trend_cache_key(keyword): trend_data for keyword, trend_data in hits_by_keyword.items()
+            })
+            volumes_by_keyword.update(hits_by_keyword)
+            missing_keywords = [keyword for keyword in missing_keywords if keyword not in hits_by_keyword]
+            if not missing_keywords:
+                return volumes_by_keyword
+
+        request = self._historical_metrics_request(missing_keywords, self._history_start, self._history_end)
+
+        # Every requested keyword gets an entry, even if the API returns nothing for it
+        fetched = {keyword: {} for keyword in missing_keywords}
 
         try:
             response = self._retry_on_rate_limit(
@@ -153,34 +503,72 @@ class GoogleAdsProvider(KeywordDataProvider):
                 request=request
             )
 
-            if not response.results or not response.results[0].keyword_metrics.monthly_search_volumes:
-                return {}
-
-            trend_data = {}
-            for monthly_search_volume in response.results[0].keyword_metrics.monthly_search_volumes:
-                year = str(monthly_search_volume.year)  # Use string keys to avoid type errors
-                month_enum = monthly_search_volume.month
-                search_volume = monthly_search_volume.monthly_searches or 0
-
-                month_index = month_to_index.get(month_enum)
-
-                if month_index is not None:
-                    if year not in trend_data:
-                        trend_data[year] = [0] * 12
-                    trend_data[year][month_index] = search_volume
-                else:
-                    print(f"Skipping invalid month enum '{month_enum}' for keyword '{keyword}' in year '{year}'.")
+            start_year = self._history_start[0]
+            n_years = self._history_end[0] - start_year + 1
+
+            results = list(response.results)
+
+            # Pull the raw fields out of the protos in one pass (proto accessors
+            # can't be compiled), then decode them into the tensor in one kernel call.
+            fields = np.array([
+                (result_index, monthly_search_volume.year - start_year,
+                 int(monthly_search_volume.month), monthly_search_volume.monthly_searches or 0)
+                for result_index, result in enumerate(results)
+                for monthly_search_volume in result.keyword_metrics.monthly_search_volumes
+            ], dtype=np.int64).reshape(-1, 4)
+            volumes = np.zeros((len(results), n_years, 12), dtype=np.int32)
+            has_data = np.zeros((len(results), n_years), dtype=np.bool_)
+            skipped = _decode_volumes(
+                fields[:, 0], fields[:, 1], fields[:, 2], fields[:, 3], self._month_lookup, volumes, has_data
+            )
+            if skipped:
+                logger.debug("Skipped %d monthly volumes with an invalid month enum or year.", skipped)
+
+            # Google may return a normalized spelling (case, spacing) of a keyword,
+            # so results are matched to the requested keywords on a normalized form.
+            # Several requested keywords can share one form (e.g. "Running Shoes"
+            # and "running shoes"); each of them gets the history.
+            requested_by_normalized: Dict[str, List[str]] = {}
+            for keyword in missing_keywords:
+                requested_by_normalized.setdefault(_normalize_keyword(keyword), []).append(keyword)
+
+            for result, months_by_year, years_with_data in zip(results, volumes.tolist(), has_data.tolist()):
+                # Years are already in order; use string keys to avoid type errors
+                sorted_trend_data = {
+                    str(start_year + row): months
+                    for row, months in enumerate(months_by_year)
+                    if years_with_data[row]
+                }
+
+                # The API folds close variants of a keyword into one result, so
+                # hand the same history to every variant that was requested.
+                for text in (result.text, *result.close_variants):
+                    for requested in requested_by_normalized.get(_normalize_keyword(text), ()):
+                        fetched[requested] = sorted_trend_data
+
+            # A single keyword with a single result is unambiguous, however Google spelled it
+            if len(missing_keywords) == 1 and len(results) == 1 and not fetched[missing_keywords[0]]:
+                fetched[missing_keywords[0]] = sorted_trend_data
+
+            # Only successful, non-empty histories are cached; the rest are retried next time
+            fetched_by_key = {
+                self._trend_cache_key(keyword): trend_data for keyword, trend_data in fetched.items() if trend_data
+            }
+            self._store_in_memory_cache(fetched_by_key)
+            _disk_cache_put_many({
+                self._disk_cache_key(cache_key): trend_data for cache_key, trend_data in fetched_by_key.items()
+            })
 
-            # Sort the years for a clean output
-            sorted_trend_data = {year: trend_data[year] for year in sorted(trend_data)}
-            return sorted_trend_data
+            volumes_by_keyword.update(fetched)
+            return volumes_by_keyword
 
         except GoogleAdsException as ex:
-            print(f"Request with ID '{ex.request_id}' failed.")
-            for error in error.failure.errors:
-                print(f"\tError code: {error.error_code}")
-                print(f"\tMessage: {error.message}")
-            return {}
+            logger.error(f"Request with ID '{ex.request_id}' failed.")
+            for error in ex.failure.errors:
+                logger.error(f"\tError code: {error.error_code}")
+                logger.error(f"\tMessage: {error.message}")
+            volumes_by_keyword.update((keyword, {}) for keyword in missing_keywords)
+            return volumes_by_keyword
 
     def filter_keywords_by_monthly_volume(self, keywords: List[str]) -> List[str]:
         """
@@ -201,25 +589,9 @@ class GoogleAdsProvider(KeywordDataProvider):
         MIN_AVG_VOLUME = 10
 
         # Use GenerateKeywordHistoricalMetricsRequest for checking existence and volume.
-        request = self.client.get_type("GenerateKeywordHistoricalMetricsRequest")
-        request.customer_id = self.customer_id
-        request.keywords.extend(keywords)
-
-        request.language = f"languageConstants/{self.language_code}"
-        request.geo_target_constants.append(f"geoTargetConstants/{self.geo_target_id}")
-
         # Setting HistoricalMetricsOptions is optional for this quick check,
         # but including a minimal range ensures the API is prompted to return search volume data.
-        historical_metrics_options = self.client.get_type("HistoricalMetricsOptions")
-        today = datetime.now()
-        start_date = today - relativedelta(months=1)
-        end_date = today
-
-        historical_metrics_options.year_month_range.start.year = start_date.year
-        historical_metrics_options.year_month_range.start.month = start_date.month
-        historical_metrics_options.year_month_range.end.year = end_date.year
-        historical_metrics_options.year_month_range.end.month = end_date.month
-        request.historical_metrics_options = historical_metrics_options
+        request = self._historical_metrics_request(keywords, self._filter_start, self._history_end)
 
         try:
             # Call the service that returns historical metrics for the provided keywords
@@ -243,10 +615,10 @@ class GoogleAdsProvider(KeywordDataProvider):
             return high_quality_keywords
 
         except GoogleAdsException as ex:
-            print(f"Request with ID '{ex.request_id}' failed during keyword filtering.")
+            logger.error(f"Request with ID '{ex.request_id}' failed during keyword filtering.")
             for error in ex.failure.errors:
-                print(f"\tError code: {error.error_code}")
-                print(f"\tMessage: {error.message}")
+                logger.error(f"\tError code: {error.error_code}")
+                logger.error(f"\tMessage: {error.message}")
             # If the API call fails, return the original list to be safe, as intended.
             return keywords
 
@@ -255,10 +627,10 @@ class GoogleAdsProvider(KeywordDataProvider):
         Generates a list of relevant keyword ideas from a list of seed keywords.
         The ad_group_name parameter was removed as it's not a valid field for the request.
         """
-        request = self.client.get_type("GenerateKeywordIdeasRequest")
+        request = self._keyword_ideas_request_cls()
         request.customer_id = self.customer_id
-        request.language = f"languageConstants/{self.language_code}"
-        request.geo_target_constants.append(f"geoTargetConstants/{self.geo_target_id}")
+        request.language = self._language_resource
+        request.geo_target_constants.append(self._geo_target_resource)
 
         # Set the seeds for keyword ideas
         request.keyword_seed.keywords.extend(seed_keywords)
@@ -279,10 +651,10 @@ class GoogleAdsProvider(KeywordDataProvider):
             return keyword_ideas
 
         except GoogleAdsException as ex:
-            print(f"Request with ID '{ex.request_id}' failed for keyword ideas.")
+            logger.error(f"Request with ID '{ex.request_id}' failed for keyword ideas.")
             for error in ex.failure.errors:
-                print(f"\tError code: {error.error_code}")
-                print(f"\tMessage: {error.message}")
+                logger.error(f"\tError code: {error.error_code}")
+                logger.error(f"\tMessage: {error.message}")
             return []
 
     def generate_output(self) -> List[Dict[str, Any]]:
@@ -293,29 +665,78 @@ class GoogleAdsProvider(KeywordDataProvider):
         This method is now a simplified part of the pipeline, assuming the
         data has already been expanded by the KeywordIdeaExpander.
         """
-        analyzed_categories = []
-        for category_data in self.data:
-            category_name = category_data.get("category")
-            analyzed_ad_groups = []
-            for ad_group_data in category_data.get("ad_groups", []):
-                ad_group_name = ad_group_data.get("ad_group")
-                analyzed_keywords = []
-                for keyword_data in ad_group_data.get("keywords", []):
-                    keyword = keyword_data.get("keyword")
-                    trend_history = self.get_monthly_volumes_by_year(keyword)
-                    analyzed_keywords.append({
-                        "keyword": keyword,
-                        "trend_history": trend_history
-                    })
-                analyzed_ad_groups.append({
-                    "ad_group": ad_group_name,
-                    "keywords": analyzed_keywords
+        return list(self.iter_output())
+
+    def iter_output(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yields the categories of generate_output one at a time, each as soon as
+        the batches holding its keywords have been fetched, so callers that
+        process categories incrementally don't wait for (or hold) the whole result.
+        """
+        # Collect every unique keyword up front and fetch them in large batches,
+        # one request per batch, running the batches concurrently; the requests
+        # are I/O-bound, and a rate-limit backoff on one batch does not hold up
+        # the others. Each keyword costs one lookup no matter how many ad groups
+        # reference it, and cached keywords cost none.
+        unique_keywords = list(dict.fromkeys(
+            keyword_data.get("keyword")
+            for category_data in self.data
+            for ad_group_data in category_data.get("ad_groups", [])
+            for keyword_data in ad_group_data.get("keywords", [])
+        ))
+        keyword_batches = [
+            unique_keywords[i:i + HISTORICAL_METRICS_BATCH_SIZE]
+            for i in range(0, len(unique_keywords), HISTORICAL_METRICS_BATCH_SIZE)
+        ]
+        trend_histories = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Batches come back in submission order, and keywords were batched in
+            # order of first appearance, so a category is complete once every
+            # batch up to the one holding its last new keyword has arrived.
+            batch_results = executor.map(self.get_monthly_volumes_by_year_batch, keyword_batches)
+            keywords_seen = set()
+            batches_done = 0
+            for category_data in self.data:
+                keywords_seen.update(
+                    keyword_data.get("keyword")
+                    for ad_group_data in category_data.get("ad_groups", [])
+                    for keyword_data in ad_group_data.get("keywords", [])
+                )
+                while batches_done * HISTORICAL_METRICS_BATCH_SIZE < len(keywords_seen):
+                    trend_histories.update(next(batch_results))
+                    batches_done += 1
+                yield self._build_category_output(category_data, trend_histories)
+
+    def generate_output_bytes(self) -> bytes:
+        """
+        Returns the generate_output result serialized as compact JSON bytes,
+        for callers that send or store it rather than use the dicts directly.
+        """
+        return _dumps_json(self.generate_output())
+
+    @staticmethod
+    def _build_category_output(category_data: Dict[str, Any],
+                               trend_histories: Dict[str, Dict[str, List[int]]]) -> Dict[str, Any]:
+        """Assembles one category of the output from the fetched trend histories."""
+        analyzed_ad_groups = []
+        for ad_group_data in category_data.get("ad_groups", []):
+            ad_group_name = ad_group_data.get("ad_group")
+            analyzed_keywords = []
+            for keyword_data in ad_group_data.get("keywords", []):
+                keyword = keyword_data.get("keyword")
+                trend_history = trend_histories.get(keyword, {})
+                analyzed_keywords.append({
+                    "keyword": keyword,
+                    "trend_history": trend_history
                 })
-            analyzed_categories.append({
-                "category": category_name,
-                "ad_groups": analyzed_ad_groups
+            analyzed_ad_groups.append({
+                "ad_group": ad_group_name,
+                "keywords": analyzed_keywords
             })
-        return analyzed_categories
+        return {
+            "category": category_data.get("category"),
+            "ad_groups": analyzed_ad_groups
+        }
 
     def get_campaign_data(self) -> List[Dict[str, Any]]:
         """
@@ -326,9 +747,14 @@ class GoogleAdsProvider(KeywordDataProvider):
             A list of dictionaries, where each dictionary represents a campaign
             and its associated ad groups and labels.
         """
+        cached = _campaign_cache.get(self.customer_id)
+        if cached and time.time() - cached[0] < CAMPAIGN_CACHE_TTL_SECONDS:
+            return copy.deepcopy(cached[1])
+
         campaigns_dict = {}
+        seen_ad_group_ids = {}
         try:
-            ga_service = self.client.get_service("GoogleAdsService")
+            ga_service = self.ga_service
 
             # Query 1: Get campaign data along with ad groups
             ad_group_query = """
@@ -360,9 +786,10 @@ class GoogleAdsProvider(KeywordDataProvider):
                             "ad_groups": [],
                             "labels": []
                         }
+                        seen_ad_group_ids[campaign_id] = set()
 
-                    if ad_group_id and ad_group_id not in [ag['ad_group_id'] for ag in
-                                                           campaigns_dict[campaign_id]["ad_groups"]]:
+                    if ad_group_id and ad_group_id not in seen_ad_group_ids[campaign_id]:
+                        seen_ad_group_ids[campaign_id].add(ad_group_id)
                         campaigns_dict[campaign_id]["ad_groups"].append({
                             "ad_group_id": ad_group_id,
                             "ad_group_name": ad_group_name
@@ -377,63 +804,61 @@ class GoogleAdsProvider(KeywordDataProvider):
                                    ORDER BY campaign.id \
                                    """
 
+            # The label queries return few rows, so a paged unary search is cheaper
+            # than setting up a server stream; search_stream is kept for ad groups.
             label_resource_names = {}
-            campaign_response = self._retry_on_rate_limit(ga_service.search_stream, customer_id=self.customer_id,
+            campaign_response = self._retry_on_rate_limit(ga_service.search, customer_id=self.customer_id,
                                                           query=campaign_label_query)
 
-            for batch in campaign_response:
-                for row in batch.results:
-                    campaign_id = row.campaign.id
-                    label_resource_name = row.campaign_label.label
+            for row in campaign_response:
+                campaign_id = row.campaign.id
+                label_resource_name = row.campaign_label.label
 
-                    if campaign_id not in label_resource_names:
-                        label_resource_names[campaign_id] = []
-                    label_resource_names[campaign_id].append(label_resource_name)
+                if campaign_id not in label_resource_names:
+                    label_resource_names[campaign_id] = []
+                label_resource_names[campaign_id].append(label_resource_name)
 
-            # Query 3: Fetch the label names based on their resource names
-            # This is the crucial step to get the actual label names.
+            # Query 3: Fetch the label names for the whole account in one request.
+            # An account's label set is small, so this is cheaper than building
+            # chunked IN-clauses over the referenced resource names.
             if label_resource_names:
-                all_label_resources = [res_name for campaign_labels in label_resource_names.values() for res_name in
-                                       campaign_labels]
-
-                # Split large lists into chunks for the IN clause
-                chunk_size = 1000
-                for i in range(0, len(all_label_resources), chunk_size):
-                    chunk = all_label_resources[i:i + chunk_size]
-                    label_query = f"""
-                        SELECT
-                            label.resource_name,
-                            label.name
-                        FROM label
-                        WHERE label.resource_name IN ('{"','".join(chunk)}')
-                    """
-                    label_response = self._retry_on_rate_limit(ga_service.search_stream, customer_id=self.customer_id,
-                                                               query=label_query)
-
-                    label_names_map = {row.label.resource_name: row.label.name for batch in label_response for row in
-                                       batch.results}
-
-                    # Merge labels into the main dictionary
-                    for campaign_id, res_names in label_resource_names.items():
-                        if campaign_id in campaigns_dict:
-                            for res_name in res_names:
-                                if res_name in label_names_map:
-                                    campaigns_dict[campaign_id]["labels"].append(label_names_map[res_name])
-
-            # Sort campaigns: live campaigns (ENABLED) first, then all others
-            campaign_list = sorted(
-                list(campaigns_dict.values()),
-                key=lambda x: x["campaign_status"] != "ENABLED"
-            )
+                label_query = """
+                              SELECT label.resource_name, \
+                                     label.name
+                              FROM label \
+                              """
+                label_response = self._retry_on_rate_limit(ga_service.search, customer_id=self.customer_id,
+                                                           query=label_query)
+
+                label_names_map = {row.label.resource_name: row.label.name for row in label_response}
+
+                # Merge labels into the main dictionary
+                for campaign_id, res_names in label_resource_names.items():
+                    if campaign_id in campaigns_dict:
+                        for res_name in res_names:
+                            if res_name in label_names_map:
+                                campaigns_dict[campaign_id]["labels"].append(label_names_map[res_name])
+
+            # Order campaigns: live campaigns (ENABLED) first, then all others,
+            # each group keeping its original order
+            enabled_campaigns, other_campaigns = [], []
+            for campaign in campaigns_dict.values():
+                if campaign["campaign_status"] == "ENABLED":
+                    enabled_campaigns.append(campaign)
+                else:
+                    other_campaigns.append(campaign)
+            campaign_list = enabled_campaigns + other_campaigns
 
         except GoogleAdsException as ex:
-            print(f"Request with ID '{ex.request_id}' failed for fetching campaigns.")
+            logger.error(f"Request with ID '{ex.request_id}' failed for fetching campaigns.")
             for error in ex.failure.errors:
-                print(f"\tError code: {error.error_code}")
-                print(f"\tMessage: {error.message}")
+                logger.error(f"\tError code: {error.error_code}")
+                logger.error(f"\tMessage: {error.message}")
             return []
 
-        return campaign_list
+        _campaign_cache[self.customer_id] = (time.time(), campaign_list)
+        # Callers get their own copy so edits to a campaign never leak into the cache
+        return copy.deepcopy(campaign_list)
 
     def set_campaign_label(self, campaign_id: str, label_name: str, action: str):
         """
@@ -444,72 +869,132 @@ class GoogleAdsProvider(KeywordDataProvider):
             label_name (str): The name of the label to apply or remove.
             action (str): The action to perform, 'add' or 'remove'.
         """
-        # 1. Get or create the label
-        label_service = self.client.get_service("LabelService")
-        label_resource_name = None
+        return self.set_campaign_labels([(campaign_id, label_name, action)])
+
+    def set_campaign_labels(self, operations: List[Tuple[str, str, str]]) -> bool:
+        """
+        Creates or retrieves labels and applies or removes them from many campaigns
+        at once: one label lookup, at most one label creation request, and one
+        campaign label mutate request, however many operations are given.
 
+        Args:
+            operations: (campaign_id, label_name, action) tuples, where action is
+                        'add' or 'remove'.
+
+        Returns:
+            True if every operation was applied, False otherwise.
+        """
+        if not operations:
+            return True
+        if any(action not in ("add", "remove") for _, _, action in operations):
+            logger.error("Invalid action. Must be 'add' or 'remove'.")
+            return False
+
+        # 1. Get or create the labels
+        label_names = list(dict.fromkeys(label_name for _, label_name, _ in operations))
         try:
-            get_label_query = f"""
+            label_name_literals = ", ".join(_gaql_string(label_name) for label_name in label_names)
+            get_labels_query = f"""
                 SELECT
-                    label.resource_name
+                    label.resource_name,
+                    label.name
                 FROM label
                 WHERE
-                    label.name = '{label_name}'
-                LIMIT 1
+                    label.name IN ({label_name_literals})
             """
             response = self._retry_on_rate_limit(
-                self.client.get_service("GoogleAdsService").search,
+                self.ga_service.search,
                 customer_id=self.customer_id,
-                query=get_label_query
+                query=get_labels_query
             )
-
-            if response.results:
-                label_resource_name = response.results[0].label.resource_name
-            else:
-                # If label doesn't exist, create it
-                label_operation = self.client.get_type("LabelOperation")
-                label = label_operation.create
-                label.name = label_name
+            label_resource_names = {row.label.name: row.label.resource_name for row in response}
+
+            # Create any labels that don't exist yet
+            missing_labels = [label_name for label_name in label_names if label_name not in label_resource_names]
+            if missing_labels:
+                label_operations = []
+                for label_name in missing_labels:
+                    label_operation = self._label_operation_cls()
+                    label_operation.create.name = label_name
+                    label_operations.append(label_operation)
                 label_response = self._retry_on_rate_limit(
-                    label_service.mutate_labels,
+                    self.label_service.mutate_labels,
                     customer_id=self.customer_id,
-                    operations=[label_operation]
+                    operations=label_operations
                 )
-                label_resource_name = label_response.results[0].resource_name
+                for label_name, result in zip(missing_labels, label_response.results):
+                    label_resource_names[label_name] = result.resource_name
 
         except GoogleAdsException as ex:
-            print(f"Error getting/creating label: {ex}")
+            logger.error(f"Error getting/creating label: {ex}")
             return False
 
-        if not label_resource_name:
-            print("Failed to get or create label.")
-            return False
-
-        # 2. Apply or remove the label from the campaign
-        campaign_label_service = self.client.get_service("CampaignLabelService")
-        operation = self.client.get_type("CampaignLabelOperation")
-
-        # Determine the correct operation type based on the action
-        if action == 'add':
-            campaign_label = operation.create
-            campaign_label.campaign = f"customers/{self.customer_id}/campaigns/{campaign_id}"
-            campaign_label.label = label_resource_name
-        elif action == 'remove':
-            # For removal, we need the resource name of the campaign_label entity itself as a string
-            campaign_label_resource_name = f"customers/{self.customer_id}/campaignLabels/{campaign_id}~{label_resource_name.split('/')[-1]}"
-            operation.remove = campaign_label_resource_name
-        else:
-            print("Invalid action. Must be 'add' or 'remove'.")
+        if any(not label_resource_names.get(label_name) for label_name in label_names):
+            logger.error("Failed to get or create label.")
             return False
 
+        # 2. Apply or remove the labels from the campaigns
+        campaign_label_operations = []
+        for campaign_id, label_name, action in operations:
+            label_resource_name = label_resource_names[label_name]
+            operation = self._campaign_label_operation_cls()
+            if action == "add":
+                campaign_label = operation.create
+                campaign_label.campaign = f"customers/{self.customer_id}/campaigns/{campaign_id}"
+                campaign_label.label = label_resource_name
+            else:
+                # For removal, we need the resource name of the campaign_label entity itself as a string
+                operation.remove = (f"customers/{self.customer_id}/campaignLabels/"
+                                    f"{campaign_id}~{label_resource_name.split('/')[-1]}")
+            campaign_label_operations.append(operation)
+
+        # Partial failure lets the valid operations go through when some fail
+        # (e.g. removing a label a campaign no longer has, or a duplicate add).
+        request = self._mutate_campaign_labels_request_cls()
+        request.customer_id = self.customer_id
+        request.operations = campaign_label_operations
+        request.partial_failure = True
         try:
-            self._retry_on_rate_limit(
-                campaign_label_service.mutate_campaign_labels,
-                customer_id=self.customer_id,
-                operations=[operation]
+            response = self._retry_on_rate_limit(
+                self.campaign_label_service.mutate_campaign_labels,
+                request=request
             )
-            print(f"Successfully '{action}'ed label '{label_name}' for campaign '{campaign_id}'.")
-            return True
         except GoogleAdsException as ex:
-            print(f"Error '{action}'ing label for campaign: {ex}")
-            return False
\ No newline at end of file
+            logger.error(f"Error updating campaign labels: {ex}")
+            return False
+
+        failures = self._partial_failure_messages(response)
+        for index, (campaign_id, label_name, action) in enumerate(operations):
+            if index in failures:
+                logger.error(f"Failed to '{action}' label '{label_name}' for campaign '{campaign_id}': "
+                             f"{failures[index]}")
+            else:
+                logger.info(f"Successfully '{action}'ed label '{label_name}' for campaign '{campaign_id}'.")
+        # The cached campaign listing no longer reflects these campaigns' labels
+        _campaign_cache.pop(self.customer_id, None)
+        return not failures
+
+    def _partial_failure_messages(self, response) -> Dict[int, str]:
+        """
+        Maps the index of each operation that failed in a partial-failure mutate
+        to its error message. Empty if every operation succeeded.
+        """
+        partial_failure = getattr(response, "partial_failure_error", None)
+        if not partial_failure or not partial_failure.code:
+            return {}
+
+        failures = {}
+        for detail in partial_failure.details:
+            failure = self._google_ads_failure_cls.deserialize(detail.value)
+            for error in failure.errors:
+                for path_element in error.location.field_path_elements:
+                    if path_element.field_name == "operations":
+                        failures.setdefault(path_element.index, error.message)
+                        break
+        if not failures:
+            # Fall back to the results: failed operations come back without a resource name
+            failures = {
+                index: partial_failure.message
+                for index, result in enumerate(response.results) if not result.resource_name
+            }
+        return failures
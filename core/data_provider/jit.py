@@ -0,0 +1,30 @@
+import functools
+import importlib.util
+
+# Numba is optional. Importing it costs well over 100 ms, so only check that it is
+# installed here; it is imported (and each kernel compiled) on the first kernel call.
+NUMBA_AVAILABLE = importlib.util.find_spec("numba") is not None
+
+
+def njit(*args, **kwargs):
+    """
+    Lazy numba.njit: the decorated kernel is compiled on its first call. Without
+    Numba the kernel runs as plain Python.
+    """
+    def decorate(func):
+        if not NUMBA_AVAILABLE:
+            return func
+        compiled = None
+
+        @functools.wraps(func)
+        def wrapper(*call_args):
+            nonlocal compiled
+            if compiled is None:
+                from numba import njit as numba_njit
+                compiled = numba_njit(**kwargs)(func)
+            return compiled(*call_args)
+        return wrapper
+
+    if len(args) == 1 and callable(args[0]) and not kwargs:
+        return decorate(args[0])
+    return decorate
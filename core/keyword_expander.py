@@ -1,65 +1,338 @@
-import time
+import ast
+import asyncio
+import hashlib
 import json
-from typing import List, Dict, Optional
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, List, Dict, Optional
 from config import settings
-from openai import OpenAI
+from core.async_runner import run_sync
+from openai import AsyncOpenAI, RateLimitError
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional; without it files are written with the stdlib json module.
+    orjson = None
+
+# 429s are handled by the header-driven limiter below rather than by the SDK
+client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, max_retries=0)
+
+# Maximum number of expansion requests in flight at once
+MAX_CONCURRENT_REQUESTS = 10
+
+# Keywords expanded per OpenAI request by expand_keywords_batch
+EXPANSION_BATCH_SIZE = 10
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+# Starting requests-per-minute budget; the limiter adopts the account's real
+# limit from the x-ratelimit-* headers of the first response.
+REQUESTS_PER_MINUTE = 500
+MAX_RATE_LIMIT_RETRIES = 3
 
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNIT_SECONDS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
 
-def expand_keyword(keyword: str, n: int = 2, model="gpt-3.5-turbo") -> List[str]:
+
+def _parse_reset_duration(value: str) -> float:
+    """Parses an x-ratelimit-reset-* header such as '6m0s', '1.5s' or '120ms' into seconds."""
+    return sum(float(amount) * _DURATION_UNIT_SECONDS[unit] for amount, unit in _DURATION_PART.findall(value))
+
+
+class AsyncRateLimiter:
+    """
+    Sliding-window requests-per-minute limiter driven by OpenAI's rate-limit
+    headers. The window size follows x-ratelimit-limit-requests, and when the
+    remaining request budget is exhausted (or a 429 arrives) every caller waits
+    for the advertised reset instead of a fixed per-call delay.
+    """
+
+    def __init__(self, rpm: int):
+        self.rpm = rpm
+        self._sent_at = deque()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                while self._sent_at and now - self._sent_at[0] >= 60:
+                    self._sent_at.popleft()
+                if len(self._sent_at) < self.rpm:
+                    self._sent_at.append(now)
+                    return self
+                await asyncio.sleep(60 - (now - self._sent_at[0]))
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+    def pause(self, seconds: float) -> None:
+        """Holds back every caller for the given number of seconds."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def update_from_headers(self, headers: Any) -> None:
+        """Adopts the limits reported in a response's x-ratelimit-* headers."""
+        limit = headers.get("x-ratelimit-limit-requests", "")
+        if limit.isdigit() and int(limit) > 0:
+            self.rpm = int(limit)
+        if headers.get("x-ratelimit-remaining-requests") == "0":
+            self.pause(_parse_reset_duration(headers.get("x-ratelimit-reset-requests", "")))
+
+
+_rate_limiter = AsyncRateLimiter(REQUESTS_PER_MINUTE)
+
+
+async def _create_completion(**kwargs) -> str:
+    """
+    Runs one chat completion through the shared rate limiter and returns the
+    message content. 429s pause all callers until the advertised reset and are
+    retried up to MAX_RATE_LIMIT_RETRIES times.
+    """
+    for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+        try:
+            async with _rate_limiter:
+                raw_response = await client.chat.completions.with_raw_response.create(**kwargs)
+        except RateLimitError as e:
+            if attempt == MAX_RATE_LIMIT_RETRIES:
+                raise
+            headers = e.response.headers
+            retry_after = headers.get("retry-after", "")
+            reset = headers.get("x-ratelimit-reset-requests", "")
+            _rate_limiter.pause(
+                float(retry_after) if retry_after.isdigit() else _parse_reset_duration(reset) or 2 ** attempt
+            )
+            continue
+        _rate_limiter.update_from_headers(raw_response.headers)
+        return raw_response.parse().choices[0].message.content
+
+# Expansions are cached on disk by (model, n, keyword), so reruns over the same
+# keywords skip the API entirely.
+EXPANSION_CACHE_PATH = Path(__file__).parent.parent / ".keyword_expansion_cache.sqlite3"
+EXPANSION_CACHE_TTL_SECONDS = 30 * 24 * 3600
+_expansion_cache_conn: Optional[sqlite3.Connection] = None
+_expansion_cache_lock = threading.Lock()
+
+
+def _expansion_cache_key(keyword: str, n: int, model: str) -> str:
+    """Returns the cache key for one expansion request."""
+    return hashlib.sha1(f"{model}|{n}|{keyword}".encode()).hexdigest()
+
+
+def _expansion_cache_connection() -> sqlite3.Connection:
+    """Opens the on-disk expansion cache on first use. Callers must hold _expansion_cache_lock."""
+    global _expansion_cache_conn
+    if _expansion_cache_conn is None:
+        _expansion_cache_conn = sqlite3.connect(str(EXPANSION_CACHE_PATH), check_same_thread=False)
+        _expansion_cache_conn.execute(
+            "CREATE TABLE IF NOT EXISTS keyword_expansion ("
+            "cache_key TEXT PRIMARY KEY, keywords TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+    return _expansion_cache_conn
+
+
+def _expansion_cache_get(cache_key: str) -> Optional[List[str]]:
+    """Returns the cached, unexpired expansion for a key, or None."""
+    try:
+        with _expansion_cache_lock:
+            row = _expansion_cache_connection().execute(
+                "SELECT keywords FROM keyword_expansion WHERE cache_key = ? AND expires_at > ?",
+                (cache_key, time.time())
+            ).fetchone()
+    except sqlite3.Error as e:
+        print(f"[WARNING] Keyword expansion cache read failed: {e}")
+        return None
+    return json.loads(row[0]) if row else None
+
+
+def _expansion_cache_put(cache_key: str, keywords: List[str]) -> None:
+    """Stores an expansion in the on-disk cache."""
+    try:
+        with _expansion_cache_lock:
+            conn = _expansion_cache_connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO keyword_expansion (cache_key, keywords, expires_at) VALUES (?, ?, ?)",
+                    (cache_key, json.dumps(keywords), time.time() + EXPANSION_CACHE_TTL_SECONDS)
+                )
+    except sqlite3.Error as e:
+        print(f"[WARNING] Keyword expansion cache write failed: {e}")
+
+
+def _parse_keyword_list(raw: str) -> List[str]:
+    """
+    Parses the model's {"keywords": [...]} answer, falling back to a bare
+    list literal for answers that ignore the requested format.
+    """
+    try:
+        result = json.loads(raw)
+    except json.JSONDecodeError:
+        result = ast.literal_eval(raw.strip())
+    if isinstance(result, dict):
+        result = result.get("keywords")
+    return result if isinstance(result, list) else []
+
+
+# Requirements for every generated query, shared by the single and bulk prompts
+_RESULT_RULES = (
+    "Each result must be:\n"
+    "- Short and concise (2 to 4 words)\n"
+    "- Naturally typed by real users (no fluff, no jargon, no marketing phrases)\n"
+    "- Related to the same intent (including synonyms, slang, or product types)\n\n"
+)
+
+
+async def expand_keyword(keyword: str, n: int = 2, model="gpt-3.5-turbo") -> List[str]:
     """
     Use OpenAI GPT to generate N similar keywords to a given keyword.
+    Results are served from the on-disk expansion cache when available.
     """
+    cache_key = _expansion_cache_key(keyword, n, model)
+    cached = _expansion_cache_get(cache_key)
+    if cached is not None:
+        return cached
+
     prompt = (
         f"You are a keyword research expert helping build a trend detection tool.\n\n"
         f"Given the keyword: \"{keyword}\", generate {n} realistic search queries that people would "
         "use in search engines like Google when looking for the same thing or related products.\n\n"
-        "Each result must be:\n"
-        "- Short and concise (2 to 4 words)\n"
-        "- Naturally typed by real users (no fluff, no jargon, no marketing phrases)\n"
-        "- Related to the same intent (including synonyms, slang, or product types)\n\n"
+        f"{_RESULT_RULES}"
         "Examples:\n"
         "Input: \"budget gaming laptop\"\n"
-        "Output: [\"cheap gaming laptop\", \"affordable gaming laptop\", \"low-cost gaming laptop\", \"entry level gaming laptop\", \"best gaming laptops under 500\"]\n\n"
+        "Output: {\"keywords\": [\"cheap gaming laptop\", \"affordable gaming laptop\", \"low-cost gaming laptop\", \"entry level gaming laptop\", \"best gaming laptops under 500\"]}\n\n"
         f"Now do the same for: \"{keyword}\"\n"
-        "Return only a valid Python list of strings. No explanations."
+        "Return only a JSON object with a \"keywords\" array of strings. No explanations."
     )
 
     try:
-        response = client.chat.completions.create(
+        raw = await _create_completion(
             model=model,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.7,
             max_tokens=100,
+            response_format={"type": "json_object"},
         )
-        raw = response.choices[0].message.content
-        result = eval(raw.strip(), {"__builtins__": None}, {})  # Expected list output
-        return result if isinstance(result, list) else []
+        result = _parse_keyword_list(raw)
+        # Empty answers are not cached so they are retried next time
+        if result:
+            _expansion_cache_put(cache_key, result)
+        return result
     except Exception as e:
         print(f"[ERROR] Failed to expand keyword '{keyword}': {e}")
         return []
 
 
+async def expand_keywords_bulk(
+    keywords: List[str],
+    per_kw_n: int = 2,
+    model: str = "gpt-3.5-turbo"
+) -> Dict[str, List[str]]:
+    """
+    Use one OpenAI GPT request to generate per_kw_n similar keywords for each of
+    several keywords, sharing the prompt overhead and round trip across them.
+    Keywords the answer leaves out are expanded individually.
+    """
+    prompt = (
+        f"You are a keyword research expert helping build a trend detection tool.\n\n"
+        f"For each keyword below, generate {per_kw_n} realistic search queries that people would "
+        "use in search engines like Google when looking for the same thing or related products.\n\n"
+        f"{_RESULT_RULES}"
+        "Examples:\n"
+        "Input: [\"budget gaming laptop\"]\n"
+        "Output: {\"budget gaming laptop\": [\"cheap gaming laptop\", \"affordable gaming laptop\"]}\n\n"
+        f"Now do the same for: {json.dumps(keywords, ensure_ascii=False)}\n"
+        "Return only a JSON object mapping each input keyword, exactly as given, to an array of strings. "
+        "No explanations."
+    )
+
+    answer = {}
+    try:
+        raw = await _create_completion(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.7,
+            max_tokens=100 * len(keywords),
+            response_format={"type": "json_object"},
+        )
+        answer = json.loads(raw)
+    except Exception as e:
+        print(f"[ERROR] Failed to expand keywords {keywords}: {e}")
+
+    expansions = {}
+    missing_keywords = []
+    for kw in keywords:
+        similar = answer.get(kw) if isinstance(answer, dict) else None
+        if isinstance(similar, list) and similar:
+            expansions[kw] = similar
+            _expansion_cache_put(_expansion_cache_key(kw, per_kw_n, model), similar)
+        else:
+            missing_keywords.append(kw)
+
+    fallback_results = await asyncio.gather(*(expand_keyword(kw, n=per_kw_n, model=model) for kw in missing_keywords))
+    expansions.update(zip(missing_keywords, fallback_results))
+    return expansions
+
+
+async def _expand_keywords_concurrently(
+    keywords: List[str],
+    n: int,
+    model: str,
+    max_concurrency: int
+) -> List[Dict[str, List[str]]]:
+    """
+    Expands every keyword, packing uncached keywords EXPANSION_BATCH_SIZE to a
+    request and running at most max_concurrency requests at once. Returns the
+    results in input order.
+    """
+    expansions = {}
+    uncached_keywords = []
+    for kw in dict.fromkeys(keywords):
+        cached = _expansion_cache_get(_expansion_cache_key(kw, n, model))
+        if cached is not None:
+            expansions[kw] = cached
+        else:
+            uncached_keywords.append(kw)
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _bounded(chunk: List[str]) -> Dict[str, List[str]]:
+        async with semaphore:
+            print(f"🔍 Expanding: {', '.join(chunk)}")
+            return await expand_keywords_bulk(chunk, per_kw_n=n, model=model)
+
+    chunks = [
+        uncached_keywords[i:i + EXPANSION_BATCH_SIZE]
+        for i in range(0, len(uncached_keywords), EXPANSION_BATCH_SIZE)
+    ]
+    for chunk_expansions in await asyncio.gather(*(_bounded(chunk) for chunk in chunks)):
+        expansions.update(chunk_expansions)
+
+    return [
+        {
+            "keyword": kw,
+            "similar_keywords": list(expansions.get(kw, []))
+        }
+        for kw in keywords
+    ]
+
+
 def expand_keywords_batch(
     keywords: List[str],
     n: int = 2,
-    delay: float = 1.1,
-    model: str = "gpt-3.5-turbo"
+    model: str = "gpt-3.5-turbo",
+    max_concurrency: int = MAX_CONCURRENT_REQUESTS
 ) -> List[Dict[str, List[str]]]:
     """
     Expand a list of keywords into a list of dictionaries with similar keywords.
+    Requests run concurrently; this blocks until all of them have finished.
     """
-    results = []
-    for kw in keywords:
-        print(f"🔍 Expanding: {kw}")
-        similar = expand_keyword(kw, n=n, model=model)
-        results.append({
-            "keyword": kw,
-            "similar_keywords": similar
-        })
-        time.sleep(delay)  # avoid OpenAI rate limiting
-    return results
+    return run_sync(_expand_keywords_concurrently(keywords, n, model, max_concurrency))
 
 
 def save_expanded_keywords_to_file(
@@ -69,8 +342,11 @@ def save_expanded_keywords_to_file(
     """
     Save expanded keyword data to a JSON file.
     """
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(expanded, f, indent=2, ensure_ascii=False)
+    if orjson is not None:
+        Path(path).write_bytes(orjson.dumps(expanded, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(expanded, f, indent=2, ensure_ascii=False)
     print(f"✅ Saved expanded keywords to {path}")
 
 
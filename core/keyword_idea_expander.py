@@ -1,13 +1,11 @@
-import sys
+import logging
 import time
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 
-# Add the project root to sys.path to access modules
-project_root = Path(__file__).parent.parent.parent
-sys.path.insert(0, str(project_root))
+from .data_provider.google_ads_provider import GoogleAdsProvider, MAX_CONCURRENT_REQUESTS
 
-from core.data_provider.google_ads_provider import GoogleAdsProvider
+logger = logging.getLogger(__name__)
 
 
 class KeywordIdeaExpander:
@@ -16,9 +14,12 @@ class KeywordIdeaExpander:
     relevant keyword ideas based on existing keywords or the ad group's name.
     """
 
-    def __init__(self, google_ads_provider: GoogleAdsProvider, keywords_per_group: int = 5):
+    def __init__(self, google_ads_provider: GoogleAdsProvider, keywords_per_group: int = 5,
+                 max_workers: int = MAX_CONCURRENT_REQUESTS):
         self.provider = google_ads_provider
         self.keywords_per_group = keywords_per_group
+        # Upper bound on concurrent keyword idea requests
+        self.max_workers = max_workers
 
     def expand_keywords(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
@@ -33,52 +34,60 @@ class KeywordIdeaExpander:
             The same data structure with ad groups now populated with up to
             `keywords_per_group` keywords.
         """
+        # First decide what each ad group needs, then fetch all the ideas
+        # concurrently; each call is an independent Google Ads round trip.
+        pending = []
         for category in data:
             for ad_group in category.get("ad_groups", []):
-                existing_keywords = [kw.get('keyword') for kw in ad_group.get("keywords", []) if kw.get('keyword')]
+                ad_group_name = ad_group.get("ad_group")
+                ad_group_keywords = ad_group.setdefault("keywords", [])
+                existing_keywords = [kw.get('keyword') for kw in ad_group_keywords if kw.get('keyword')]
                 num_existing = len(existing_keywords)
 
                 # If the ad group already has enough keywords, skip
                 if num_existing >= self.keywords_per_group:
-                    print(f"Ad group '{ad_group.get('ad_group')}' already has enough keywords. Skipping expansion.")
+                    logger.debug("Ad group '%s' already has enough keywords. Skipping expansion.", ad_group_name)
                     continue
 
                 # Determine the seeds for keyword idea generation
                 seeds = existing_keywords
                 if not seeds:
                     # If there are no existing keywords, use the ad group name as the seed
-                    ad_group_name = ad_group.get("ad_group")
                     if ad_group_name:
                         seeds = [ad_group_name]
                     else:
-                        print(f"Skipping ad group with no name or keywords.")
+                        logger.debug("Skipping ad group with no name or keywords.")
                         continue
 
-                print(f"Expanding ad group '{ad_group.get('ad_group')}' with seeds: {seeds}...")
+                logger.debug("Expanding ad group '%s' with seeds: %s...", ad_group_name, seeds)
 
                 # Request more keywords than needed to allow for filtering
                 keywords_to_fetch = self.keywords_per_group - num_existing + 5  # Fetch a few extra
-
-                # Call the provider to get keyword ideas
-                new_ideas = self.provider.get_keyword_ideas(
-                    seed_keywords=seeds,
-                    max_results=keywords_to_fetch
-                )
-
-                # Filter out duplicates and append to the existing list
-                unique_new_keywords = [
-                    {"keyword": kw} for kw in new_ideas if kw not in existing_keywords
-                ]
+                pending.append((ad_group_name, ad_group_keywords, existing_keywords, seeds, keywords_to_fetch))
+
+        if not pending:
+            return data
+
+        # Call the provider to get keyword ideas for every ad group
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            all_new_ideas = executor.map(
+                lambda job: self.provider.get_keyword_ideas(seed_keywords=job[3], max_results=job[4]),
+                pending
+            )
+            for (ad_group_name, ad_group_keywords, existing_keywords, _, _), new_ideas in zip(pending, all_new_ideas):
+                # Filter out keywords already in the group (and repeats among the
+                # ideas themselves) with set lookups
+                seen = set(existing_keywords)
+                unique_new_keywords = []
+                for kw in new_ideas:
+                    if kw not in seen:
+                        seen.add(kw)
+                        unique_new_keywords.append(kw)
 
                 # Combine existing keywords with new ideas, respecting the limit
-                current_keywords_count = num_existing
-                for new_kw_dict in unique_new_keywords:
-                    if current_keywords_count < self.keywords_per_group:
-                        ad_group["keywords"].append(new_kw_dict)
-                        current_keywords_count += 1
-                    else:
-                        break
+                needed = self.keywords_per_group - len(existing_keywords)
+                ad_group_keywords.extend({"keyword": kw} for kw in unique_new_keywords[:needed])
 
-                print(f"  -> Final keyword count for '{ad_group.get('ad_group')}': {len(ad_group['keywords'])}")
+                logger.debug("  -> Final keyword count for '%s': %d", ad_group_name, len(ad_group_keywords))
 
         return data
\ No newline at end of file
@@ -2,30 +2,116 @@ import streamlit as st
 import redis
 import os
 import json
+import functools
 from typing import List, Dict, Any, Optional
 
 # --- Constants & Initialization ---
 SETTINGS_KEY = "dashboard_settings"
+# Hash of tracked keyword -> JSON-encoded campaign ID, so a single keyword's
+# link can be written without re-sending the whole list
 KEYWORDS_KEY = "tracked_keywords"
+# Sorted set of tracked keyword -> position, since a hash doesn't keep the
+# order the user listed the keywords in
+KEYWORDS_ORDER_KEY = "tracked_keywords_order"
 
+# How long reads are served from the local cache before going back to Redis.
+# Every write through this module clears the cache immediately.
+READ_CACHE_TTL_SECONDS = 5
 
-def get_redis_client():
-    """Establishes and returns a Redis client connection using Streamlit secrets."""
+# Client whose KEYWORDS_KEY has been checked for the legacy JSON-list format
+_keywords_hash_checked_client = None
+
+
+@functools.lru_cache(maxsize=1)
+def _redis_client_for_url(redis_url: str):
+    """
+    Creates the Redis client for a URL once, so every settings call (and every
+    dashboard rerun) shares one connection pool instead of opening a new one.
+    """
+    return redis.from_url(redis_url, socket_keepalive=True, health_check_interval=30)
+
+
+def _get_redis_url() -> Optional[str]:
+    """Returns the Redis URL from Streamlit secrets or the environment, or None if it is not set."""
     try:
         # First, try to get the URL from Streamlit secrets (for dashboard)
         if "REDIS_URL" in st.secrets:
-            redis_url = st.secrets["REDIS_URL"]
+            return st.secrets["REDIS_URL"]
         # Fallback to environment variable (for local script execution)
         elif "REDIS_URL" in os.environ:
-            redis_url = os.environ["REDIS_URL"]
+            return os.environ["REDIS_URL"]
         else:
             raise ValueError("REDIS_URL not found in Streamlit secrets or environment variables.")
-        return redis.from_url(redis_url)
     except Exception as e:
         st.error(f"Error connecting to Redis: {e}")
         return None
 
 
+def get_redis_client():
+    """Establishes and returns a Redis client connection using Streamlit secrets."""
+    redis_url = _get_redis_url()
+    if redis_url is None:
+        return None
+    try:
+        return _redis_client_for_url(redis_url)
+    except Exception as e:
+        st.error(f"Error connecting to Redis: {e}")
+        return None
+
+
+def _clear_read_cache() -> None:
+    """Drops cached reads after a write so the next read sees the new data."""
+    _read_all_settings.clear()
+    _read_keywords.clear()
+    _read_keywords_enriched.clear()
+
+
+def _ensure_keywords_hash(r) -> None:
+    """
+    Converts a KEYWORDS_KEY stored in the legacy format (one JSON string holding
+    the whole list) into the hash format. Checked once per client.
+    """
+    global _keywords_hash_checked_client
+    if _keywords_hash_checked_client is r:
+        return
+    if r.type(KEYWORDS_KEY) == b"string":
+        legacy_keywords = json.loads(r.get(KEYWORDS_KEY) or "[]")
+        pipe = r.pipeline()
+        pipe.delete(KEYWORDS_KEY, KEYWORDS_ORDER_KEY)
+        if legacy_keywords:
+            pipe.hset(KEYWORDS_KEY, mapping={
+                kw_data['keyword']: json.dumps(kw_data.get('campaign_id')) for kw_data in legacy_keywords
+            })
+            pipe.zadd(KEYWORDS_ORDER_KEY, {
+                kw_data['keyword']: position for position, kw_data in enumerate(legacy_keywords)
+            })
+        pipe.execute()
+    _keywords_hash_checked_client = r
+
+
+def _saved_order_key(order: List[bytes]):
+    """
+    Sort key putting keywords in the order of a ZRANGE of KEYWORDS_ORDER_KEY.
+    Keywords missing from it (saved before it existed) go last.
+    """
+    positions = {keyword.decode(): position for position, keyword in enumerate(order)}
+    return lambda keyword: positions.get(keyword, len(positions))
+
+
+def _decode_keywords_hash(raw: Dict[bytes, bytes], order: List[bytes]) -> List[Dict[str, Any]]:
+    """
+    Turns an HGETALL of KEYWORDS_KEY into the list of {keyword, campaign_id}
+    dictionaries, in the saved keyword order.
+    """
+    position = _saved_order_key(order)
+    keywords = [
+        {"keyword": keyword.decode(), "campaign_id": json.loads(campaign_id)}
+        for keyword, campaign_id in raw.items()
+    ]
+    keywords.sort(key=lambda kw_data: position(kw_data["keyword"]))
+    return keywords
+
+
 def initialize_redis_settings(force=False):
     """
     Initializes the Redis database with default settings if they don't exist.
@@ -46,24 +132,39 @@ def initialize_redis_settings(force=False):
         "min_hits_threshold": 100,
         "slack_webhook_url": ""
     }
-    r.set(SETTINGS_KEY, json.dumps(default_settings))
-    # Keywords are now stored as a list of dictionaries to include campaign ID
-    r.set(KEYWORDS_KEY, json.dumps([]))
+    # Both keys are written in one round trip
+    pipe = r.pipeline(transaction=False)
+    pipe.set(SETTINGS_KEY, json.dumps(default_settings))
+    # An empty hash is simply an absent key
+    pipe.delete(KEYWORDS_KEY, KEYWORDS_ORDER_KEY)
+    pipe.execute()
+    _clear_read_cache()
     st.success("Database initialized with default settings and empty keywords!")
     print("Database initialized with default settings and empty keywords.")
 
 
 def get_all_settings():
     """Retrieves all settings from the Redis database."""
-    r = get_redis_client()
-    if r is None:
+    redis_url = _get_redis_url()
+    if redis_url is None:
         return {}
+    return _read_all_settings(redis_url)
 
-    settings_json = r.get(SETTINGS_KEY)
-    settings = json.loads(settings_json) if settings_json else {}
 
-    keywords_json = r.get(KEYWORDS_KEY)
-    settings["tracked_keywords"] = json.loads(keywords_json) if keywords_json else []
+@st.cache_data(ttl=READ_CACHE_TTL_SECONDS, show_spinner=False)
+def _read_all_settings(redis_url: str) -> Dict[str, Any]:
+    """Reads all settings for get_all_settings; cached per Redis URL."""
+    r = _redis_client_for_url(redis_url)
+    _ensure_keywords_hash(r)
+
+    # Fetch all keys in a single round trip
+    pipe = r.pipeline(transaction=False)
+    pipe.get(SETTINGS_KEY)
+    pipe.hgetall(KEYWORDS_KEY)
+    pipe.zrange(KEYWORDS_ORDER_KEY, 0, -1)
+    settings_json, keywords_hash, keywords_order = pipe.execute()
+    settings = json.loads(settings_json) if settings_json else {}
+    settings["tracked_keywords"] = _decode_keywords_hash(keywords_hash, keywords_order)
 
     return settings
 
@@ -73,17 +174,24 @@ def get_keywords() -> List[str]:
     Retrieves the tracked keywords from the Redis database and returns a simple list of strings.
     This ensures backward compatibility with app.py.
     """
-    r = get_redis_client()
-    if r is None:
+    redis_url = _get_redis_url()
+    if redis_url is None:
         return []
+    return _read_keywords(redis_url)
 
-    keywords_json = r.get(KEYWORDS_KEY)
-    if not keywords_json:
-        return []
 
-    # The stored data is now a list of dictionaries, so we extract the 'keyword' value
-    keywords_list_enriched = json.loads(keywords_json)
-    return [kw_data['keyword'] for kw_data in keywords_list_enriched]
+@st.cache_data(ttl=READ_CACHE_TTL_SECONDS, show_spinner=False)
+def _read_keywords(redis_url: str) -> List[str]:
+    """Reads the tracked keyword names for get_keywords; cached per Redis URL."""
+    r = _redis_client_for_url(redis_url)
+    _ensure_keywords_hash(r)
+
+    # Only the hash fields are needed, not the campaign links
+    pipe = r.pipeline(transaction=False)
+    pipe.hkeys(KEYWORDS_KEY)
+    pipe.zrange(KEYWORDS_ORDER_KEY, 0, -1)
+    keyword_names, keywords_order = pipe.execute()
+    return sorted((keyword.decode() for keyword in keyword_names), key=_saved_order_key(keywords_order))
 
 
 def save_all_settings(notification_threshold: int, min_hits_threshold: int, slack_webhook_url: str):
@@ -99,6 +207,7 @@ def save_all_settings(notification_threshold: int, min_hits_threshold: int, slac
     }
     try:
         r.set(SETTINGS_KEY, json.dumps(settings_to_save))
+        _clear_read_cache()
         return True
     except Exception as e:
         st.error(f"Error saving settings to Redis: {e}")
@@ -113,22 +222,25 @@ def save_keywords(keywords: List[str]):
     r = get_redis_client()
     if r is None:
         return False
-
-    # Retrieve the full enriched list to preserve campaign associations
-    keywords_list_enriched = get_keywords_enriched()
-    existing_map = {kw['keyword']: kw.get('campaign_id') for kw in keywords_list_enriched}
-
-    # Format the new list of keywords, adding campaign_id if it existed
-    keywords_to_save = []
-    for keyword in keywords:
-        campaign_id = existing_map.get(keyword)
-        keywords_to_save.append({
-            "keyword": keyword,
-            "campaign_id": campaign_id
-        })
+    _ensure_keywords_hash(r)
 
     try:
-        r.set(KEYWORDS_KEY, json.dumps(keywords_to_save))
+        # Only the difference is written: removed keywords are deleted and new
+        # ones added unlinked, leaving existing campaign associations untouched.
+        # Positions are rewritten so reads return the keywords in this order.
+        existing_keywords = {keyword.decode() for keyword in r.hkeys(KEYWORDS_KEY)}
+        removed_keywords = existing_keywords.difference(keywords)
+        pipe = r.pipeline()
+        if removed_keywords:
+            pipe.hdel(KEYWORDS_KEY, *removed_keywords)
+        for keyword in keywords:
+            if keyword not in existing_keywords:
+                pipe.hsetnx(KEYWORDS_KEY, keyword, json.dumps(None))
+        pipe.delete(KEYWORDS_ORDER_KEY)
+        if keywords:
+            pipe.zadd(KEYWORDS_ORDER_KEY, {keyword: position for position, keyword in enumerate(keywords)})
+        pipe.execute()
+        _clear_read_cache()
         return True
     except Exception as e:
         st.error(f"Error saving keywords to Redis: {e}")
@@ -140,11 +252,22 @@ def get_keywords_enriched() -> List[Dict[str, Any]]:
     Retrieves the full list of tracked keywords with their campaign data.
     This is for internal use where the enriched data is needed.
     """
-    r = get_redis_client()
-    if r is None:
+    redis_url = _get_redis_url()
+    if redis_url is None:
         return []
-    keywords_json = r.get(KEYWORDS_KEY)
-    return json.loads(keywords_json) if keywords_json else []
+    return _read_keywords_enriched(redis_url)
+
+
+@st.cache_data(ttl=READ_CACHE_TTL_SECONDS, show_spinner=False)
+def _read_keywords_enriched(redis_url: str) -> List[Dict[str, Any]]:
+    """Reads the enriched keyword list for get_keywords_enriched; cached per Redis URL."""
+    r = _redis_client_for_url(redis_url)
+    _ensure_keywords_hash(r)
+
+    pipe = r.pipeline(transaction=False)
+    pipe.hgetall(KEYWORDS_KEY)
+    pipe.zrange(KEYWORDS_ORDER_KEY, 0, -1)
+    return _decode_keywords_hash(*pipe.execute())
 
 
 def save_keyword_campaign_links(links: Dict[str, Optional[int]]):
@@ -155,20 +278,20 @@ def save_keyword_campaign_links(links: Dict[str, Optional[int]]):
     r = get_redis_client()
     if r is None:
         return False
-
-    # Get the current list of keywords from Redis
-    current_keywords = get_keywords_enriched()
-
-    # Iterate through the current keywords and update their campaign IDs
-    # if they are present in the 'links' dictionary.
-    for kw_data in current_keywords:
-        keyword = kw_data['keyword']
-        if keyword in links:
-            kw_data['campaign_id'] = links[keyword]
+    _ensure_keywords_hash(r)
 
     try:
-        r.set(KEYWORDS_KEY, json.dumps(current_keywords))
+        # Only links for keywords that are still tracked are written
+        existing_keywords = {keyword.decode() for keyword in r.hkeys(KEYWORDS_KEY)}
+        updates = {
+            keyword: json.dumps(campaign_id)
+            for keyword, campaign_id in links.items()
+            if keyword in existing_keywords
+        }
+        if updates:
+            r.hset(KEYWORDS_KEY, mapping=updates)
+            _clear_read_cache()
         return True
     except Exception as e:
         st.error(f"Error saving keyword-campaign links to Redis: {e}")
-        return False
\ No newline at end of file
+        return False
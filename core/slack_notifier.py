@@ -1,5 +1,32 @@
+import asyncio
+import atexit
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from config.settings import SLACK_WEBHOOK_URL
+from core.async_runner import run_sync
+
+# One pooled session for all webhook posts, so a batch of alerts reuses a single
+# keep-alive connection instead of a new TLS handshake per message. Rate limits
+# and 5xx responses are retried with backoff (honoring Retry-After), as are
+# failed connections. Read errors and timeouts are not: Slack may already have
+# posted the message, and resending it would duplicate the alert.
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=3,
+        connect=3,
+        read=0,
+        other=0,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=None,
+        raise_on_status=False,
+    ),
+))
 
 def send_slack_message(text: str, webhook_url: str):
     """
@@ -11,13 +38,76 @@ def send_slack_message(text: str, webhook_url: str):
     """
     payload = {"text": text}
     try:
-        response = requests.post(webhook_url, json=payload)
+        response = _SESSION.post(webhook_url, json=payload, timeout=(3, 10))
         response.raise_for_status() # This will raise an HTTPError for bad responses (4xx or 5xx)
     except requests.exceptions.RequestException as e:
         # Catch and handle specific request exceptions for better error reporting
         raise Exception(f"Failed to send Slack message: {e}") from e
 
 
+# Alert batches are posted concurrently over one pooled async client, with at
+# most MAX_CONCURRENT_POSTS in flight; 429s and 5xx responses are retried.
+MAX_CONCURRENT_POSTS = 10
+MAX_POST_RETRIES = 3
+_RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+# Transport errors raised before the request reached Slack, so it is safe to resend
+_UNSENT_REQUEST_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+_async_client = httpx.AsyncClient(
+    timeout=httpx.Timeout(10.0, connect=3.0),
+    limits=httpx.Limits(max_connections=MAX_CONCURRENT_POSTS, max_keepalive_connections=MAX_CONCURRENT_POSTS)
+)
+
+
+def _close_async_client():
+    """Closes the shared async HTTP pool at interpreter exit."""
+    if not _async_client.is_closed:
+        try:
+            run_sync(_async_client.aclose())
+        except Exception:
+            pass
+
+
+atexit.register(_close_async_client)
+
+
+async def _send_slack_message_async(text: str, webhook_url: str, semaphore: asyncio.Semaphore) -> None:
+    """
+    Async counterpart of send_slack_message. Rate limits (429, honoring Retry-After),
+    5xx responses and failed connections are retried with exponential backoff.
+    Errors after the request may have been sent are not retried, so an alert is
+    never posted twice.
+    """
+    payload = {"text": text}
+    async with semaphore:
+        for attempt in range(MAX_POST_RETRIES + 1):
+            backoff = 0.3 * 2 ** attempt
+            try:
+                response = await _async_client.post(webhook_url, json=payload)
+            except httpx.HTTPError as e:
+                if not isinstance(e, _UNSENT_REQUEST_ERRORS) or attempt == MAX_POST_RETRIES:
+                    raise Exception(f"Failed to send Slack message: {e}") from e
+                await asyncio.sleep(backoff)
+                continue
+            if response.status_code in _RETRY_STATUS_CODES and attempt < MAX_POST_RETRIES:
+                retry_after = response.headers.get("Retry-After", "")
+                await asyncio.sleep(float(retry_after) if retry_after.isdigit() else backoff)
+                continue
+            try:
+                response.raise_for_status()
+            except httpx.HTTPStatusError as e:
+                raise Exception(f"Failed to send Slack message: {e}") from e
+            return
+
+
+async def _send_messages_async(messages: list[str], webhook_url: str) -> list:
+    """Posts all messages concurrently; returns None or the raised exception per message, in order."""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_POSTS)
+    return await asyncio.gather(
+        *(_send_slack_message_async(message, webhook_url, semaphore) for message in messages),
+        return_exceptions=True
+    )
+
+
 def format_alert_message(alert: dict) -> str:
     """Formats a single alert dict into a Slack-friendly message."""
     arrow = "📈" if alert["pct_change_month"] > 0 else "📉"
@@ -49,14 +139,16 @@ def send_alerts_to_slack(alerts: list[dict], webhook_url: str, dry_run: bool = F
         print("No alerts to send.")
         return
 
-    for alert in alerts:
-        message = format_alert_message(alert)
-        if dry_run:
+    messages = [format_alert_message(alert) for alert in alerts]
+    if dry_run:
+        for message in messages:
             print(f"\n[DRY RUN] Would send:\n{message}")
+        return
+
+    # Send every alert concurrently, then report the outcomes in alert order
+    outcomes = run_sync(_send_messages_async(messages, webhook_url))
+    for alert, outcome in zip(alerts, outcomes):
+        if isinstance(outcome, Exception):
+            print(f"Failed to send alert for '{alert['keyword']}': {outcome}")
         else:
-            try:
-                # Pass the webhook_url to the send_slack_message function
-                send_slack_message(message, webhook_url)
-                print(f"Successfully sent alert for '{alert['keyword']}'.")
-            except Exception as e:
-                print(f"Failed to send alert for '{alert['keyword']}': {e}")
\ No newline at end of file
+            print(f"Successfully sent alert for '{alert['keyword']}'.")
\ No newline at end of file
@@ -1,6 +1,7 @@
+import functools
 import sys
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set, Tuple
 from datetime import datetime
 import numpy as np
 
@@ -8,6 +9,86 @@ import numpy as np
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+from core.data_provider.jit import njit, NUMBA_AVAILABLE
+
+# Levels TrendAnalyzer.analyze can report metrics at; see its `levels` argument
+ANALYSIS_LEVELS = frozenset({"category", "ad_group", "keyword"})
+
+
+@njit(cache=True)
+def _metrics_kernel(past_volumes, current_volumes, month_index, next_month_index, next_3mo_indices,
+                    previous_month_current_year, avg_searches, volatility, pct_next_month, pct_next_3mo,
+                    pct_counts):
+    """
+    Scalar-loop version of TrendAnalyzer's packed metrics for use under Numba.
+    For each history row of the (histories, past years, 12) `past_volumes` tensor
+    and (histories, 12) `current_volumes` slab, writes the average positive monthly
+    searches, the seasonal volatility, and the mean next-month / next-3-month
+    changes into the preallocated outputs. `pct_counts` (histories, 2) receives how
+    many years contributed to each change so callers can tell "no data" from 0.
+    """
+    n_histories, n_years, n_months = past_volumes.shape
+    monthly_means = np.empty(n_months)
+    for h in range(n_histories):
+        search_total = 0.0
+        search_count = 0
+        change_total_month = 0.0
+        change_total_3mo = 0.0
+        change_count_month = 0
+        change_count_3mo = 0
+        for m in range(n_months):
+            month_total = 0.0
+            month_count = 0
+            for y in range(n_years):
+                value = past_volumes[h, y, m]
+                if value > 0:
+                    month_total += value
+                    month_count += 1
+            search_total += month_total
+            search_count += month_count
+            monthly_means[m] = month_total / month_count if month_count > 0 else 0.0
+        for m in range(previous_month_current_year):
+            value = current_volumes[h, m]
+            if value > 0:
+                search_total += value
+                search_count += 1
+        avg_searches[h] = search_total / search_count if search_count > 0 else 0.0
+
+        means_total = 0.0
+        for m in range(n_months):
+            means_total += monthly_means[m]
+        mean_of_means = means_total / n_months
+        if mean_of_means != 0:
+            squares_total = 0.0
+            for m in range(n_months):
+                squares_total += (monthly_means[m] - mean_of_means) ** 2
+            volatility[h] = np.sqrt(squares_total / n_months) / mean_of_means
+        else:
+            volatility[h] = 0.0
+
+        for y in range(n_years):
+            current_value = past_volumes[h, y, month_index]
+            if current_value == 0:
+                continue
+            future_value = past_volumes[h, y, next_month_index]
+            if future_value > 0:
+                change_total_month += (future_value - current_value) / current_value
+                change_count_month += 1
+            future_total = 0.0
+            future_count = 0
+            for i in range(next_3mo_indices.size):
+                value = past_volumes[h, y, next_3mo_indices[i]]
+                if value > 0:
+                    future_total += value
+                    future_count += 1
+            if future_count > 0:
+                change_total_3mo += (future_total / future_count - current_value) / current_value
+                change_count_3mo += 1
+        pct_next_month[h] = change_total_month / change_count_month if change_count_month > 0 else 0.0
+        pct_next_3mo[h] = change_total_3mo / change_count_3mo if change_count_3mo > 0 else 0.0
+        pct_counts[h, 0] = change_count_month
+        pct_counts[h, 1] = change_count_3mo
+
 
 class TrendAnalyzer:
     def __init__(self, month_index: Optional[int] = None):
@@ -16,11 +97,13 @@ class TrendAnalyzer:
         """
         # The month index is always the previous month to the current one
         # to ensure we don't use the current month's zero data.
-        self.month_index = month_index if month_index is not None else (datetime.now().month - 2 + 12) % 12
+        now = datetime.now()
+        self.month_index = month_index if month_index is not None else (now.month - 2 + 12) % 12
         self.next_month_index = (self.month_index + 1) % 12
         self.next_3mo_indices = [(self.month_index + i) % 12 for i in range(1, 4)]
-        self.current_year = datetime.now().year
-        self.previous_month_current_year = (datetime.now().month - 1 + 12) % 12
+        self.next_3mo_indices_arr = np.array(self.next_3mo_indices, dtype=np.int64)
+        self.current_year = now.year
+        self.previous_month_current_year = (now.month - 1 + 12) % 12
 
     def _safe_get(self, arr: List[int], i: int) -> int:
         """Safely gets a value from a list, returning 0 if the index is out of bounds."""
@@ -36,8 +119,14 @@ class TrendAnalyzer:
         """
         Calculates the average percentage change based on historical data.
         """
+        if single_month:
+            return self._calculate_pct_change_next_month(history)
+        return self._calculate_pct_change_next_3mo(history)
+
+    def _calculate_pct_change_next_month(self, history: Dict[int, List[int]]) -> float:
+        """_calculate_pct_change specialized for the next month, with no per-year mode branch."""
+        month_index, next_month_index = self.month_index, self.next_month_index
         changes = []
-        current_year = datetime.now().year
 
         for year_str, months in history.items():
             try:
@@ -45,21 +134,43 @@ class TrendAnalyzer:
             except ValueError:
                 continue
 
-            if year >= current_year:
+            if year >= self.current_year:
                 continue
 
-            current_value = self._safe_get(months, self.month_index)
+            current_value = months[month_index] if month_index < len(months) else 0
             if current_value == 0:
                 continue
 
-            if single_month:
-                future_value = self._safe_get(months, self.next_month_index)
-            else:
-                future_value = self._safe_avg(months, self.next_3mo_indices)
+            future_value = months[next_month_index] if next_month_index < len(months) else 0
+            if future_value > 0:
+                changes.append((future_value - current_value) / current_value)
+
+        if not changes:
+            return 0.0
+
+        return round(sum(changes) / len(changes) * 100, 1)
+
+    def _calculate_pct_change_next_3mo(self, history: Dict[int, List[int]]) -> float:
+        """_calculate_pct_change specialized for the next three months, with no per-year mode branch."""
+        month_index, next_3mo_indices = self.month_index, self.next_3mo_indices
+        changes = []
+
+        for year_str, months in history.items():
+            try:
+                year = int(year_str)
+            except ValueError:
+                continue
+
+            if year >= self.current_year:
+                continue
 
+            current_value = months[month_index] if month_index < len(months) else 0
+            if current_value == 0:
+                continue
+
+            future_value = self._safe_avg(months, next_3mo_indices)
             if future_value > 0:
-                change = (future_value - current_value) / current_value
-                changes.append(change)
+                changes.append((future_value - current_value) / current_value)
 
         if not changes:
             return 0.0
@@ -107,22 +218,36 @@ class TrendAnalyzer:
                     if searches > 0:
                         monthly_searches.setdefault(i, []).append(searches)
 
-        # Calculate mean for each month across all years
-        monthly_means = [np.mean(monthly_searches.get(i, [0])) for i in range(12)]
+        # Calculate mean for each month across all years. Plain Python arithmetic:
+        # on twelve values, NumPy's per-call overhead outweighs the math.
+        monthly_means = []
+        for i in range(12):
+            searches = monthly_searches.get(i)
+            monthly_means.append(sum(searches) / len(searches) if searches else 0.0)
 
-        if np.sum(monthly_means) == 0:
+        if sum(monthly_means) == 0:
             return 0.0
 
-        # Calculate standard deviation of monthly means
-        std_dev = np.std(monthly_means)
-
-        # Normalize the standard deviation by the mean of all monthly means
-        avg_monthly_mean = np.mean(monthly_means)
-
+        # Normalize the standard deviation of monthly means by the mean of all monthly means
+        avg_monthly_mean = sum(monthly_means) / 12
         if avg_monthly_mean == 0:
             return 0.0
+        std_dev = (sum((mean - avg_monthly_mean) ** 2 for mean in monthly_means) / 12) ** 0.5
 
-        return round(std_dev / avg_monthly_mean, 2)
+        # Rounded as np.float64 so the score matches NumPy's rounding, as before
+        return round(np.float64(std_dev / avg_monthly_mean), 2)
+
+    def _keyword_metrics(self, history: Dict[Any, List[int]]) -> Tuple[int, float, float, float]:
+        """
+        Computes (avg_monthly_searches, seasonal_volatility_score, pct_change_next_month,
+        pct_change_next_3mo) for a single history.
+        """
+        return (
+            self._calculate_avg_monthly_searches(history),
+            self._calculate_seasonal_volatility(history),
+            self._calculate_pct_change_next_month(history),
+            self._calculate_pct_change_next_3mo(history),
+        )
 
     def _analyze_keyword(self, keyword_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -130,13 +255,14 @@ class TrendAnalyzer:
         """
         history = keyword_data.get("trend_history", {})
 
-        # Calculate new metrics
-        avg_monthly_searches = self._calculate_avg_monthly_searches(history)
-        seasonal_volatility_score = self._calculate_seasonal_volatility(history)
-
-        # Retain existing metrics
-        pct_change_next_month = self._calculate_pct_change(history, single_month=True)
-        pct_change_next_3mo = self._calculate_pct_change(history, single_month=False)
+        # Metrics are pure in the history, so repeated histories are served from the memo
+        history_key = self._history_key(history) if history else None
+        if history_key is not None:
+            metrics = _compute_metrics(history_key, self.month_index, self.current_year,
+                                       self.previous_month_current_year)
+        else:
+            metrics = self._keyword_metrics(history)
+        avg_monthly_searches, seasonal_volatility_score, pct_change_next_month, pct_change_next_3mo = metrics
 
         # Combine all metrics into the output
         keyword_data.update({
@@ -147,25 +273,203 @@ class TrendAnalyzer:
         })
         return keyword_data
 
-    def _analyze_ad_group(self, ad_group_data: Dict[str, Any]) -> Dict[str, Any]:
+    @staticmethod
+    def _history_key(history: Dict[Any, List[int]]) -> Optional[tuple]:
+        """Returns a hashable form of a history for deduplication, or None if it has none."""
+        try:
+            key = tuple((year, tuple(months)) for year, months in history.items())
+            hash(key)
+            return key
+        except TypeError:
+            return None
+
+    def _pack_histories(self, histories: List[Dict[Any, List[int]]]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Packs histories into a (histories, past years, 12) volume tensor
+        plus a (histories, 12) slab for the current year. Missing years and months are
+        zero, which every metric already treats as "no data". Returns None if a
+        history doesn't fit this layout (e.g. more than 12 months in a year).
+        """
+        parsed = []
+        past_years = set()
+        for keyword_index, history in enumerate(histories):
+            for year_str, months in history.items():
+                try:
+                    year = int(year_str)
+                except ValueError:
+                    continue
+                except TypeError:
+                    return None
+                if year > self.current_year:
+                    continue
+                if len(months) > 12:
+                    return None
+                parsed.append((keyword_index, year, months))
+                if year < self.current_year:
+                    past_years.add(year)
+
+        year_rows = {year: row for row, year in enumerate(sorted(past_years))}
+        past_volumes = np.zeros((len(histories), len(year_rows), 12), dtype=np.float64)
+        current_volumes = np.zeros((len(histories), 12), dtype=np.float64)
+        try:
+            for keyword_index, year, months in parsed:
+                if year == self.current_year:
+                    current_volumes[keyword_index, :len(months)] = months
+                else:
+                    past_volumes[keyword_index, year_rows[year], :len(months)] = months
+        except (TypeError, ValueError):
+            return None
+        return past_volumes, current_volumes
+
+    @staticmethod
+    def _mean_of_positive(values: np.ndarray, axis: int) -> np.ndarray:
+        """Averages the positive entries along an axis; 0 where there are none."""
+        positive = values > 0
+        counts = positive.sum(axis=axis)
+        totals = np.where(positive, values, 0).sum(axis=axis)
+        return np.divide(totals, counts, out=np.zeros_like(totals), where=counts > 0)
+
+    def _pct_change_vectorized(self, past_volumes: np.ndarray, future_values: np.ndarray) -> List[float]:
+        """Vectorized _calculate_pct_change over all keywords: one rounded percentage per keyword."""
+        current_values = past_volumes[:, :, self.month_index]
+        valid = (current_values != 0) & (future_values > 0)
+        changes = np.divide(future_values - current_values, current_values,
+                            out=np.zeros_like(current_values), where=valid)
+        counts = valid.sum(axis=1)
+        mean_changes = np.divide(changes.sum(axis=1), counts, out=np.zeros(len(counts)), where=counts > 0)
+        return [round(change * 100, 1) if count else 0.0 for change, count in zip(mean_changes.tolist(), counts.tolist())]
+
+    def _packed_metrics_numpy(self, past_volumes: np.ndarray, current_volumes: np.ndarray
+                              ) -> Tuple[np.ndarray, np.ndarray, List[float], List[float]]:
+        """
+        Computes (avg searches, volatility, pct change next month, pct change next 3 months)
+        for packed histories with NumPy reductions over the whole tensor.
+        """
+        # Average monthly searches: past years plus the current year up to the previous month
+        searches = np.concatenate(
+            [past_volumes.reshape(len(past_volumes), -1), current_volumes[:, :self.previous_month_current_year]], axis=1
+        )
+        avg_monthly_searches = self._mean_of_positive(searches, axis=1)
+
+        # Seasonal volatility: spread of the per-month means across past years
+        monthly_means = self._mean_of_positive(past_volumes, axis=1)
+        mean_of_means = monthly_means.mean(axis=1)
+        volatility = np.divide(monthly_means.std(axis=1), mean_of_means,
+                               out=np.zeros_like(mean_of_means), where=mean_of_means != 0)
+
+        pct_change_next_month = self._pct_change_vectorized(past_volumes, past_volumes[:, :, self.next_month_index])
+        pct_change_next_3mo = self._pct_change_vectorized(
+            past_volumes, self._mean_of_positive(past_volumes[:, :, self.next_3mo_indices_arr], axis=2)
+        )
+
+        return avg_monthly_searches, volatility, pct_change_next_month, pct_change_next_3mo
+
+    def _packed_metrics_numba(self, past_volumes: np.ndarray, current_volumes: np.ndarray
+                              ) -> Tuple[np.ndarray, np.ndarray, List[float], List[float]]:
+        """Same as _packed_metrics_numpy, computed by the compiled _metrics_kernel."""
+        n_histories = len(past_volumes)
+        avg_monthly_searches = np.zeros(n_histories)
+        volatility = np.zeros(n_histories)
+        mean_changes_month = np.zeros(n_histories)
+        mean_changes_3mo = np.zeros(n_histories)
+        pct_counts = np.zeros((n_histories, 2), dtype=np.int64)
+        _metrics_kernel(
+            np.ascontiguousarray(past_volumes), current_volumes, self.month_index, self.next_month_index,
+            self.next_3mo_indices_arr, self.previous_month_current_year,
+            avg_monthly_searches, volatility, mean_changes_month, mean_changes_3mo, pct_counts,
+        )
+        pct_change_next_month = [
+            round(change * 100, 1) if count else 0.0
+            for change, count in zip(mean_changes_month.tolist(), pct_counts[:, 0].tolist())
+        ]
+        pct_change_next_3mo = [
+            round(change * 100, 1) if count else 0.0
+            for change, count in zip(mean_changes_3mo.tolist(), pct_counts[:, 1].tolist())
+        ]
+        return avg_monthly_searches, volatility, pct_change_next_month, pct_change_next_3mo
+
+    def _analyze_keywords_vectorized(self, keywords: List[Dict[str, Any]]) -> bool:
+        """
+        Computes the metrics of _analyze_keyword for all keywords at once over a
+        packed volume tensor (Numba kernel when available, NumPy reductions otherwise)
+        instead of per-year Python loops.
+        Returns False without touching the keywords if their histories can't be
+        packed, so the caller can fall back to the per-keyword path.
+        """
+        # Keywords with identical histories (e.g. the same keyword in several ad
+        # groups, or siblings sharing one trend) are packed and scored once.
+        unique_histories = []
+        history_rows = {}
+        keyword_rows = []
+        for keyword_data in keywords:
+            history = keyword_data.get("trend_history", {})
+            history_key = self._history_key(history)
+            row = history_rows.get(history_key) if history_key is not None else None
+            if row is None:
+                row = len(unique_histories)
+                unique_histories.append(history)
+                if history_key is not None:
+                    history_rows[history_key] = row
+            keyword_rows.append(row)
+
+        packed = self._pack_histories(unique_histories)
+        if packed is None:
+            return False
+        past_volumes, current_volumes = packed
+
+        if NUMBA_AVAILABLE:
+            metrics = self._packed_metrics_numba(past_volumes, current_volumes)
+        else:
+            metrics = self._packed_metrics_numpy(past_volumes, current_volumes)
+        avg_monthly_searches, volatility, pct_change_next_month, pct_change_next_3mo = metrics
+
+        # Volatility scores stay np.float64 so round() behaves as in _calculate_seasonal_volatility
+        avg_monthly_searches = avg_monthly_searches.tolist()
+        for keyword_data, row in zip(keywords, keyword_rows):
+            keyword_data.update({
+                "avg_monthly_searches": int(avg_monthly_searches[row]),
+                "seasonal_volatility_score": round(volatility[row], 2),
+                "pct_change_next_month": pct_change_next_month[row],
+                "pct_change_next_3mo": pct_change_next_3mo[row],
+            })
+        return True
+
+    @staticmethod
+    def _average_metrics(items: List[Dict[str, Any]]) -> Tuple[float, float, float, float]:
+        """
+        Averages pct_change_next_month, pct_change_next_3mo, avg_monthly_searches and
+        seasonal_volatility_score over a non-empty list of analyzed items in one pass.
+        """
+        total_next_month = total_next_3mo = total_searches = total_volatility = 0
+        for item in items:
+            total_next_month += item['pct_change_next_month']
+            total_next_3mo += item['pct_change_next_3mo']
+            total_searches += item['avg_monthly_searches']
+            total_volatility += item['seasonal_volatility_score']
+        count = len(items)
+        return total_next_month / count, total_next_3mo / count, total_searches / count, total_volatility / count
+
+    def _analyze_ad_group(self, ad_group_data: Dict[str, Any], keywords_analyzed: bool = False,
+                          levels: Set[str] = ANALYSIS_LEVELS) -> Dict[str, Any]:
         """
         Analyzes an ad group by aggregating insights from its keywords.
+        If keywords_analyzed is True, the keyword metrics have already been computed.
+        The roll-up is skipped unless ad group (or category) metrics are in `levels`.
         """
-        analyzed_keywords = [self._analyze_keyword(kw) for kw in ad_group_data.get("keywords", [])]
+        if keywords_analyzed:
+            analyzed_keywords = ad_group_data.get("keywords", [])
+        else:
+            analyzed_keywords = [self._analyze_keyword(kw) for kw in ad_group_data.get("keywords", [])]
         ad_group_data["keywords"] = analyzed_keywords
 
-        if not analyzed_keywords:
+        # Category metrics are averaged from the ad group ones, so they need them too
+        if not analyzed_keywords or ("ad_group" not in levels and "category" not in levels):
             return ad_group_data
 
-        # Calculate the average of keyword forecasts, preserving other data
-        avg_pct_change_next_month = sum(kw['pct_change_next_month'] for kw in analyzed_keywords) / len(
-            analyzed_keywords)
-        avg_pct_change_next_3mo = sum(kw['pct_change_next_3mo'] for kw in analyzed_keywords) / len(analyzed_keywords)
-
-        # Add the new ad group-level metrics
-        avg_monthly_searches = sum(kw['avg_monthly_searches'] for kw in analyzed_keywords) / len(analyzed_keywords)
-        seasonal_volatility_score = sum(kw['seasonal_volatility_score'] for kw in analyzed_keywords) / len(
-            analyzed_keywords)
+        # Calculate the average of keyword forecasts and metrics in a single pass, preserving other data
+        avg_pct_change_next_month, avg_pct_change_next_3mo, avg_monthly_searches, seasonal_volatility_score = (
+            self._average_metrics(analyzed_keywords)
+        )
 
         ad_group_data.update({
             "pct_change_next_month": round(avg_pct_change_next_month, 1),
@@ -176,27 +480,24 @@ class TrendAnalyzer:
 
         return ad_group_data
 
-    def _analyze_category(self, category_data: Dict[str, Any]) -> Dict[str, Any]:
+    def _analyze_category(self, category_data: Dict[str, Any], keywords_analyzed: bool = False,
+                          levels: Set[str] = ANALYSIS_LEVELS) -> Dict[str, Any]:
         """
         Analyzes a category by aggregating insights from its ad groups.
+        The roll-up is skipped unless category metrics are in `levels`.
         """
-        analyzed_ad_groups = [self._analyze_ad_group(group) for group in category_data.get("ad_groups", [])]
+        analyzed_ad_groups = [
+            self._analyze_ad_group(group, keywords_analyzed, levels) for group in category_data.get("ad_groups", [])
+        ]
         category_data["ad_groups"] = analyzed_ad_groups
 
-        if not analyzed_ad_groups:
+        if not analyzed_ad_groups or "category" not in levels:
             return category_data
 
-        # Calculate the average of ad group forecasts, preserving other data
-        avg_pct_change_next_month = sum(group['pct_change_next_month'] for group in analyzed_ad_groups) / len(
-            analyzed_ad_groups)
-        avg_pct_change_next_3mo = sum(group['pct_change_next_3mo'] for group in analyzed_ad_groups) / len(
-            analyzed_ad_groups)
-
-        # Add the new category-level metrics
-        avg_monthly_searches = sum(group['avg_monthly_searches'] for group in analyzed_ad_groups) / len(
-            analyzed_ad_groups)
-        seasonal_volatility_score = sum(group['seasonal_volatility_score'] for group in analyzed_ad_groups) / len(
-            analyzed_ad_groups)
+        # Calculate the average of ad group forecasts and metrics in a single pass, preserving other data
+        avg_pct_change_next_month, avg_pct_change_next_3mo, avg_monthly_searches, seasonal_volatility_score = (
+            self._average_metrics(analyzed_ad_groups)
+        )
 
         category_data.update({
             "pct_change_next_month": round(avg_pct_change_next_month, 1),
@@ -207,14 +508,44 @@ class TrendAnalyzer:
 
         return category_data
 
-    def analyze(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def analyze(self, data: List[Dict[str, Any]], levels: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
         """
         The main public method to orchestrate the analysis for a list of categories.
         Input: a list of categories, each containing ad groups and keywords.
         Output: a list of categories with analyzed trend data at each level.
+
+        `levels` selects which of ANALYSIS_LEVELS get metrics (default: all). Keywords
+        are always analyzed; ad groups and categories left out keep no averaged
+        metrics, which saves the roll-ups when only per-keyword data is needed.
         """
+        levels = ANALYSIS_LEVELS if levels is None else levels
         if not data:
             return []
 
-        analyzed_results = [self._analyze_category(category_data) for category_data in data]
-        return analyzed_results
\ No newline at end of file
+        # Score every keyword in one vectorized pass; irregular histories fall
+        # back to the per-keyword Python path inside the ad group analysis.
+        all_keywords = [
+            keyword_data
+            for category_data in data
+            for ad_group_data in category_data.get("ad_groups", [])
+            for keyword_data in ad_group_data.get("keywords", [])
+        ]
+        keywords_analyzed = self._analyze_keywords_vectorized(all_keywords)
+
+        analyzed_results = [
+            self._analyze_category(category_data, keywords_analyzed, levels) for category_data in data
+        ]
+        return analyzed_results
+
+
+@functools.lru_cache(maxsize=4096)
+def _compute_metrics(history_key: tuple, month_index: int, current_year: int,
+                     previous_month_current_year: int) -> Tuple[int, float, float, float]:
+    """
+    Memoized TrendAnalyzer._keyword_metrics keyed on a canonical history
+    (see TrendAnalyzer._history_key) and the analyzer's month settings.
+    """
+    analyzer = TrendAnalyzer(month_index)
+    analyzer.current_year = current_year
+    analyzer.previous_month_current_year = previous_month_current_year
+    return analyzer._keyword_metrics(dict(history_key))
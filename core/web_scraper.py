@@ -1,17 +1,153 @@
-import requests
-from bs4 import BeautifulSoup
-from collections import deque
+import asyncio
+import atexit
+import hashlib
+import queue
+import re
+import sqlite3
+import threading
 import time
+from collections import OrderedDict
+from pathlib import Path
+import httpx
+from bs4 import BeautifulSoup
 import random
 from urllib.parse import urljoin, urlparse
-from typing import Set, Deque, Dict, Any, Union
+from typing import Set, Dict, Any, Iterable, Iterator, Union, List, Optional, Tuple
+
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    # selectolax is optional; without it pages are parsed with BeautifulSoup.
+    HTMLParser = None
+
+try:
+    from lxml import etree
+except ImportError:
+    # lxml is optional; without it headline-only scans use the full-page parsers.
+    etree = None
 
 # Import Python's built-in logging module
 import logging
 
+from core.async_runner import get_event_loop, run_sync
+
 # Configure logging for the module
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Where a page's main text is looked for, in order of preference
+MAIN_CONTENT_SELECTORS = ('main', 'article', '#content', '.main-content', 'body')
+HEADLINE_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+# Separates text nodes while a parser flattens an element; never occurs in page text
+_NODE_SEPARATOR = '\x1f'
+
+# Link targets that are never crawled (empty, in-page anchors, javascript:, mailto:)
+# and the scheme + host of an absolute http(s) URL, matched once per <a> tag
+_SKIP_HREF_RE = re.compile(r'^(?:javascript:|mailto:|#|$)', re.IGNORECASE)
+_ABSOLUTE_URL_RE = re.compile(r'^https?://([^/?#]*)', re.IGNORECASE)
+# Dot segments, path params, empty queries and embedded tabs/newlines, which urljoin may rewrite
+_NEEDS_URLJOIN_RE = re.compile(r'/\.|;|\?(?:#|$)|[\t\r\n]')
+
+# Pages are fetched concurrently on the shared async loop over one pooled client,
+# with at most MAX_CONCURRENT_FETCHES requests in flight per crawl.
+MAX_CONCURRENT_FETCHES = 8
+MAX_FETCH_RETRIES = 3
+RETRY_BASE_DELAY_SECONDS = 2
+_RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+REQUEST_HEADERS = {
+    'User-Agent': (
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
+        'AppleWebKit/537.36 (KHTML, like Gecko) '
+        'Chrome/91.0.4472.124 Safari/537.36'
+    )
+}
+_async_client = httpx.AsyncClient(
+    headers=REQUEST_HEADERS,
+    timeout=httpx.Timeout(30.0),
+    follow_redirects=True,
+    limits=httpx.Limits(max_connections=MAX_CONCURRENT_FETCHES, max_keepalive_connections=MAX_CONCURRENT_FETCHES)
+)
+
+# Marks the end of a crawl on the page queue
+_CRAWL_DONE = object()
+
+
+def _close_async_client():
+    """Closes the shared async HTTP pool at interpreter exit."""
+    if not _async_client.is_closed:
+        try:
+            run_sync(_async_client.aclose())
+        except Exception:
+            pass
+
+
+atexit.register(_close_async_client)
+
+# Fetched pages persist on disk (SQLite) with their ETag / Last-Modified validators.
+# Pages younger than PAGE_CACHE_TTL_SECONDS are served without a request; older ones
+# are revalidated with a conditional GET, and a 304 reuses the stored body.
+PAGE_CACHE_PATH = Path(__file__).parent.parent / ".scrape_cache.sqlite3"
+PAGE_CACHE_TTL_SECONDS = 24 * 3600
+_page_cache_conn: Optional[sqlite3.Connection] = None
+_page_cache_lock = threading.Lock()
+
+# Parsed (text, hrefs) per page, keyed by the SHA-1 of its HTML, so unchanged
+# pages aren't parsed again on repeat scans.
+PARSE_CACHE_MAX_ENTRIES = 256
+_parse_cache: "OrderedDict[Tuple[str, bool], Tuple[str, List[str]]]" = OrderedDict()
+_parse_cache_lock = threading.Lock()
+
+
+def _page_cache_connection() -> sqlite3.Connection:
+    """Opens the on-disk page cache on first use. Callers must hold _page_cache_lock."""
+    global _page_cache_conn
+    if _page_cache_conn is None:
+        _page_cache_conn = sqlite3.connect(str(PAGE_CACHE_PATH), check_same_thread=False)
+        _page_cache_conn.execute(
+            "CREATE TABLE IF NOT EXISTS page ("
+            "url TEXT PRIMARY KEY, body TEXT NOT NULL, etag TEXT, last_modified TEXT, expires_at REAL NOT NULL)"
+        )
+    return _page_cache_conn
+
+
+def _page_cache_get(url: str) -> Optional[Tuple[str, Optional[str], Optional[str], bool]]:
+    """Returns (body, etag, last_modified, is_fresh) for a cached page, or None."""
+    try:
+        with _page_cache_lock:
+            row = _page_cache_connection().execute(
+                "SELECT body, etag, last_modified, expires_at FROM page WHERE url = ?", (url,)
+            ).fetchone()
+    except sqlite3.Error as e:
+        logging.warning(f"Page cache read failed: {e}")
+        return None
+    if row is None:
+        return None
+    body, etag, last_modified, expires_at = row
+    return body, etag, last_modified, expires_at > time.time()
+
+
+def _page_cache_put(url: str, body: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+    """Stores (or refreshes) a page in the on-disk cache."""
+    try:
+        with _page_cache_lock:
+            conn = _page_cache_connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO page (url, body, etag, last_modified, expires_at) VALUES (?, ?, ?, ?, ?)",
+                    (url, body, etag, last_modified, time.time() + PAGE_CACHE_TTL_SECONDS)
+                )
+    except sqlite3.Error as e:
+        logging.warning(f"Page cache write failed: {e}")
+
+
+def _join_segments(segments: Iterable[str]) -> str:
+    """
+    Joins text segments (text nodes or headlines) one per line, collapsing the
+    spacing inside each and dropping empty ones. Keeping separate elements such
+    as links and buttons on their own lines lets the keyword extractor drop
+    standalone UI text without cutting into prose.
+    """
+    return '\n'.join(filter(None, (' '.join(segment.split()) for segment in segments)))
+
 
 class WebScraper:
     """
@@ -21,40 +157,107 @@ class WebScraper:
 
     def __init__(self):
         self.visited_urls: Set[str] = set()
+        # Every URL ever put on the crawl queue, so each is queued at most once
+        self.enqueued_urls: Set[str] = set()
         self.crawled_pages_count = 0
 
-    def _fetch_page_content(self, url: str) -> Union[str, None]:
-        headers = {
-            'User-Agent': (
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
-                'AppleWebKit/537.36 (KHTML, like Gecko) '
-                'Chrome/91.0.4472.124 Safari/537.36'
-            )
-        }
-        max_retries = 3
-        base_delay_seconds = 2
+    async def _fetch_page_content(self, url: str) -> Union[str, None]:
+        # SQLite reads and commits block, so they run in a worker thread rather
+        # than stalling the other crawl workers sharing this event loop
+        cached = await asyncio.to_thread(_page_cache_get, url)
+        if cached is not None and cached[3]:
+            return cached[0]
 
-        for retry_count in range(max_retries):
+        # Revalidate a stale copy instead of downloading it again
+        conditional_headers = {}
+        if cached is not None:
+            if cached[1]:
+                conditional_headers['If-None-Match'] = cached[1]
+            if cached[2]:
+                conditional_headers['If-Modified-Since'] = cached[2]
+
+        for retry_count in range(MAX_FETCH_RETRIES):
             try:
-                response = requests.get(url, headers=headers, timeout=30)
+                response = await _async_client.get(url, headers=conditional_headers)
+                if cached is not None and response.status_code == 304:
+                    await asyncio.to_thread(_page_cache_put, url, cached[0], cached[1], cached[2])
+                    return cached[0]
                 response.raise_for_status()
+                if 'no-store' not in response.headers.get('Cache-Control', ''):
+                    await asyncio.to_thread(_page_cache_put, url, response.text, response.headers.get('ETag'),
+                                            response.headers.get('Last-Modified'))
                 return response.text
-            except requests.exceptions.RequestException as e:
+            except httpx.HTTPError as e:
                 logging.error(f"Error fetching {url}: {e}")
-                if retry_count < max_retries - 1:
-                    sleep_time = (base_delay_seconds * (2 ** retry_count)) + random.uniform(0, 1)
+                # Client errors such as 404 won't change on retry
+                if isinstance(e, httpx.HTTPStatusError) and e.response.status_code not in _RETRY_STATUS_CODES:
+                    return None
+                if retry_count < MAX_FETCH_RETRIES - 1:
+                    sleep_time = (RETRY_BASE_DELAY_SECONDS * (2 ** retry_count)) + random.uniform(0, 1)
                     logging.info(f"Retrying in {sleep_time:.2f} seconds...")
-                    time.sleep(sleep_time)
+                    await asyncio.sleep(sleep_time)
                 else:
                     logging.error(f"Max retries reached for {url}. Skipping.")
                     return None
         return None
 
-    def _extract_text_and_links(self, html_content: str, base_url: str, headlines_only: bool = False) -> tuple[
-        str, list[str]]:
-        if not html_content:
-            return "", []
+    @staticmethod
+    def _parse_headlines_with_lxml(html_content: str) -> Tuple[str, List[str]]:
+        """
+        Extracts headline text and raw link targets with lxml's pull parser, which
+        only hands back headline and <a> elements instead of a full soup to walk.
+        """
+        parser = etree.HTMLPullParser(events=('end',), tag=HEADLINE_TAGS + ('a',))
+        headlines = []
+        hrefs = []
+
+        def _collect_events():
+            for _, element in parser.read_events():
+                if element.tag == 'a':
+                    href = element.get('href')
+                    if href is not None:
+                        hrefs.append(href)
+                    continue
+                # Drop non-visible content but keep the text that follows it
+                etree.strip_elements(element, etree.Comment, 'script', 'style', 'noscript', with_tail=False)
+                headlines.append(' '.join(piece.strip() for piece in element.itertext() if piece.strip()))
+                element.clear(keep_tail=True)
+
+        parser.feed(html_content)
+        _collect_events()
+        parser.close()
+        _collect_events()
+
+        return _join_segments(headlines), hrefs
+
+    @staticmethod
+    def _parse_with_selectolax(html_content: str, headlines_only: bool) -> Tuple[str, List[str]]:
+        """Extracts the page text and raw link targets with selectolax's C parser."""
+        tree = HTMLParser(html_content)
+
+        # Clean the HTML content first
+        for node in tree.css('script, style, noscript'):
+            node.decompose()
 
+        if headlines_only:
+            headline_tags = tree.css(', '.join(HEADLINE_TAGS))
+            text = _join_segments(tag.text(separator=' ', strip=True) for tag in headline_tags)
+        else:
+            main_content = None
+            for selector in MAIN_CONTENT_SELECTORS:
+                main_content = tree.css_first(selector)
+                if main_content is not None:
+                    break
+            text = _join_segments(
+                main_content.text(separator=_NODE_SEPARATOR).split(_NODE_SEPARATOR)
+            ) if main_content is not None else ""
+
+        hrefs = [node.attributes.get('href') or '' for node in tree.css('a[href]')]
+        return text, hrefs
+
+    @staticmethod
+    def _parse_with_bs4(html_content: str, headlines_only: bool) -> Tuple[str, List[str]]:
+        """Extracts the page text and raw link targets with BeautifulSoup's html.parser."""
         soup = BeautifulSoup(html_content, 'html.parser')
 
         # Clean the HTML content first
@@ -63,9 +266,8 @@ class WebScraper:
 
         if headlines_only:
             # New logic for HEADLINES ONLY: find all header tags and join their text
-            headline_tags = soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
-            text = ' '.join(tag.get_text(separator=' ', strip=True) for tag in headline_tags)
-            text = ' '.join(text.split())  # Normalize spacing
+            headline_tags = soup.find_all(list(HEADLINE_TAGS))
+            text = _join_segments(tag.get_text(separator=' ', strip=True) for tag in headline_tags)
         else:
             # Original logic: find the main content block
             main_content = (
@@ -77,66 +279,159 @@ class WebScraper:
             )
 
             if main_content:
-                text = main_content.get_text(separator=' ', strip=True)
-                text = ' '.join(text.split())
+                text = _join_segments(main_content.stripped_strings)
             else:
                 text = ""
 
+        hrefs = [a_tag['href'] for a_tag in soup.find_all('a', href=True)]
+        return text, hrefs
+
+    def _parse_page(self, html_content: str, headlines_only: bool) -> Tuple[str, List[str]]:
+        """Parses a page into (text, hrefs), reusing the result for HTML seen before."""
+        cache_key = (hashlib.sha1(html_content.encode()).hexdigest(), headlines_only)
+        with _parse_cache_lock:
+            parsed = _parse_cache.get(cache_key)
+            if parsed is not None:
+                _parse_cache.move_to_end(cache_key)
+                return parsed
+
+        parsed = None
+        if headlines_only and etree is not None:
+            try:
+                parsed = self._parse_headlines_with_lxml(html_content)
+            except etree.LxmlError as e:
+                logging.warning(f"Streaming headline parse failed, using the full parser: {e}")
+        if parsed is None:
+            if HTMLParser is not None:
+                parsed = self._parse_with_selectolax(html_content, headlines_only)
+            else:
+                parsed = self._parse_with_bs4(html_content, headlines_only)
+
+        with _parse_cache_lock:
+            _parse_cache[cache_key] = parsed
+            if len(_parse_cache) > PARSE_CACHE_MAX_ENTRIES:
+                _parse_cache.popitem(last=False)
+        return parsed
+
+    def _extract_text_and_links(self, html_content: str, base_url: str, headlines_only: bool = False) -> tuple[
+        str, list[str]]:
+        if not html_content:
+            return "", []
+
+        text, hrefs = self._parse_page(html_content, headlines_only)
+
         links = []
         parsed_base_url = urlparse(base_url)
+        base_netloc = parsed_base_url.netloc
+        base_origin = f"{parsed_base_url.scheme}://{base_netloc}"
 
-        for a_tag in soup.find_all('a', href=True):
-            href = a_tag['href'].strip()
+        for href in hrefs:
+            href = href.strip()
 
-            if not href or href.startswith(("javascript:", "mailto:", "#")):
+            if _SKIP_HREF_RE.match(href):
                 continue
 
-            full_url = urljoin(base_url, href)
-            parsed_full_url = urlparse(full_url)
+            # Root-relative and absolute links resolve to themselves (on the base
+            # origin) unless urljoin would normalize them; only the rest are joined.
+            if _NEEDS_URLJOIN_RE.search(href):
+                full_url = urljoin(base_url, href)
+            elif href[0] == '/' and href[:2] != '//':
+                full_url = base_origin + href
+            elif href[:4] == 'http' and (href_match := _ABSOLUTE_URL_RE.match(href)) and href_match.group(1):
+                full_url = href
+            else:
+                full_url = urljoin(base_url, href)
+            absolute_match = _ABSOLUTE_URL_RE.match(full_url)
 
-            if parsed_full_url.scheme in ['http', 'https'] and parsed_full_url.netloc == parsed_base_url.netloc:
+            if absolute_match and absolute_match.group(1) == base_netloc:
                 # Normalize the URL by removing fragment and trailing slash
-                clean_url = parsed_full_url._replace(fragment="").geturl().rstrip('/')
+                clean_url = full_url.partition('#')[0].rstrip('/')
 
-                # Check if URL is not already visited
-                if clean_url not in self.visited_urls:
+                # Check if URL is not already queued or visited
+                if clean_url not in self.enqueued_urls:
                     links.append(clean_url)
 
         return text, links
 
-    def scrape_website(self, start_url: str, depth: int, max_pages: int, headlines_only: bool = False) -> str:
-        url_queue: Deque[tuple[str, int]] = deque([(start_url, 0)])
-        all_text = []
-
-        while url_queue and self.crawled_pages_count < max_pages:
-            current_url, current_depth = url_queue.popleft()
+    async def _crawl_worker(self, url_queue: asyncio.Queue, pages: queue.Queue, depth: int, max_pages: int,
+                            headlines_only: bool) -> None:
+        """Fetches and parses queued URLs until cancelled, enqueueing their links breadth-first."""
+        while True:
+            current_url, current_depth = await url_queue.get()
+            try:
+                if self.crawled_pages_count >= max_pages:
+                    continue
 
-            if current_url in self.visited_urls:
-                continue
+                self.crawled_pages_count += 1
+                self.visited_urls.add(current_url)
 
-            # Increment the page count and check the limit
-            self.crawled_pages_count += 1
-            if self.crawled_pages_count > max_pages:
-                break
+                logging.info(f"Crawling: {current_url} (Depth: {current_depth})")
 
-            self.visited_urls.add(current_url)
+                html_content = await self._fetch_page_content(current_url)
+                if not html_content:
+                    continue
 
-            logging.info(f"Crawling: {current_url} (Depth: {current_depth})")
+                # Parsing is CPU-bound, so it runs off the shared event loop
+                text, links = await asyncio.to_thread(
+                    self._extract_text_and_links, html_content, current_url, headlines_only
+                )
 
-            html_content = self._fetch_page_content(current_url)
-            if not html_content:
-                continue
+                if current_depth < depth:
+                    for link in links:
+                        # Every queued URL is crawled until max_pages is reached,
+                        # so nothing beyond the first max_pages needs queueing.
+                        if len(self.enqueued_urls) >= max_pages:
+                            break
+                        if link not in self.enqueued_urls:
+                            self.enqueued_urls.add(link)
+                            url_queue.put_nowait((link, current_depth + 1))
 
-            # Pass the new parameter to the text and link extraction method
-            text, links = self._extract_text_and_links(html_content, current_url, headlines_only)
+                if text:
+                    pages.put(text)
+            except Exception as e:
+                # One bad page must not take down a worker and stall the crawl
+                logging.error(f"Error processing {current_url}: {e}", exc_info=True)
+            finally:
+                url_queue.task_done()
 
-            if text:
-                all_text.append(text)
+    async def _crawl(self, start_url: str, depth: int, max_pages: int, headlines_only: bool,
+                     pages: queue.Queue) -> None:
+        """Crawls with MAX_CONCURRENT_FETCHES workers, putting page texts on `pages` as they are parsed."""
+        url_queue: asyncio.Queue = asyncio.Queue()
+        url_queue.put_nowait((start_url, 0))
+        self.enqueued_urls.add(start_url)
+        workers = [
+            asyncio.create_task(self._crawl_worker(url_queue, pages, depth, max_pages, headlines_only))
+            for _ in range(MAX_CONCURRENT_FETCHES)
+        ]
+        try:
+            await url_queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            pages.put(_CRAWL_DONE)
 
-            if current_depth < depth:
-                for link in links:
-                    if link not in self.visited_urls:
-                        url_queue.append((link, current_depth + 1))
+    def iter_pages(self, start_url: str, depth: int, max_pages: int, headlines_only: bool = False) -> Iterator[str]:
+        """
+        Crawls the website breadth-first and yields each page's extracted text as
+        soon as it has been fetched, so callers can start processing early pages
+        while later ones are still being crawled. Pages are fetched concurrently,
+        so they arrive in completion order rather than strict BFS order.
+        """
+        pages: queue.Queue = queue.Queue()
+        crawl = asyncio.run_coroutine_threadsafe(
+            self._crawl(start_url, depth, max_pages, headlines_only, pages), get_event_loop()
+        )
+        try:
+            while (text := pages.get()) is not _CRAWL_DONE:
+                yield text
+            crawl.result()
+        finally:
+            # Stops the crawl if the caller stops consuming pages early
+            crawl.cancel()
 
         logging.info(f"Scraping complete. Visited {len(self.visited_urls)} unique pages.")
-        return " ".join(all_text)
\ No newline at end of file
+
+    def scrape_website(self, start_url: str, depth: int, max_pages: int, headlines_only: bool = False) -> str:
+        return "\n".join(self.iter_pages(start_url, depth, max_pages, headlines_only=headlines_only))
@@ -261,7 +261,8 @@ def _perform_analysis(country: str, language: str):
         augmented_data = provider.generate_output()
 
         analyzer = TrendAnalyzer()
-        analyzed_results = analyzer.analyze(augmented_data)
+        # The dashboard only displays keyword-level metrics
+        analyzed_results = analyzer.analyze(augmented_data, levels={"keyword"})
 
         print("\n" + "=" * 50)
         print("Data with Historical Search Volumes:")
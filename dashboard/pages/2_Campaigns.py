@@ -85,7 +85,9 @@ def display_campaign_page():
     if 'keyword_links' not in st.session_state:
         st.session_state['keyword_links'] = {}
 
-    # Fetch data without caching
+    # Campaigns are cached by the provider for 15 minutes; the button forces a refetch
+    st.button("Refresh Campaigns", key="refresh_campaigns_button",
+              on_click=GoogleAdsProvider.clear_campaign_cache)
     campaign_data = GoogleAdsProvider(data=[]).get_campaign_data()
     keywords_enriched = redis_settings.get_keywords_enriched()
 
@@ -148,8 +148,11 @@ def update_campaign_labels(alerts: List[Dict[str, Any]], keywords_enriched: List
 
     # Step 2: Remove the label from all campaigns that currently have it
     print(f"Removing '{label_name}' label from {len(campaign_ids_to_remove_label)} campaign(s)...")
-    for campaign_id in campaign_ids_to_remove_label:
-        provider.set_campaign_label(campaign_id, label_name, "remove")
+    if not provider.set_campaign_labels(
+        [(campaign_id, label_name, "remove") for campaign_id in campaign_ids_to_remove_label]
+    ):
+        print(f"⚠️ Could not remove '{label_name}' from every campaign; see the errors above. "
+              f"Those campaigns may keep a stale label.")
 
     # Step 3: Find the campaign IDs for the keywords that triggered a POSITIVE alert
     positive_alerts = [alert for alert in alerts if alert['pct_change_month'] > 0]
@@ -162,8 +165,10 @@ def update_campaign_labels(alerts: List[Dict[str, Any]], keywords_enriched: List
 
     # Step 4: Add the label to the campaigns that qualify
     print(f"Adding '{label_name}' label to {len(campaign_ids_to_add_label)} campaign(s)...")
-    for campaign_id in campaign_ids_to_add_label:
-        provider.set_campaign_label(campaign_id, label_name, "add")
+    if not provider.set_campaign_labels(
+        [(campaign_id, label_name, "add") for campaign_id in campaign_ids_to_add_label]
+    ):
+        print(f"⚠️ Could not add '{label_name}' to every campaign; see the errors above.")
 
     print("Campaign labeling process complete.")
 
@@ -0,0 +1,74 @@
+import sys
+from pathlib import Path
+from typing import List
+
+# Add the project root to sys.path for module imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.ai_keyword_extractor import _split_text_into_chunks, _chunk_token_budget, _count_tokens
+
+
+def rebuild_text(chunks: List[str]) -> str:
+    """
+    Stitches overlapping chunks back together. Each chunk is appended after the
+    longest prefix of it that the text rebuilt so far already ends with (chunks cut
+    on token boundaries can start mid-word); chunks that don't overlap are joined
+    with a space.
+    """
+    rebuilt = chunks[0]
+    for chunk in chunks[1:]:
+        overlap = next((k for k in range(len(chunk), 0, -1) if rebuilt.endswith(chunk[:k])), 0)
+        rebuilt += chunk[overlap:] if overlap else " " + chunk
+    return rebuilt
+
+
+def run_tests():
+    """
+    Checks that _split_text_into_chunks keeps every chunk within the token budget,
+    overlaps consecutive chunks and loses no text: the overlapping chunks rebuild
+    the input exactly. Numbered words keep overlaps from matching by accident.
+    """
+    tests_passed = True
+    budget = _chunk_token_budget("gpt-3.5-turbo")
+
+    sentences = " ".join(f"Sentence {i} mentions product{i} and brand{i} in passing." for i in range(600))
+    run_on = " ".join(f"headline{i}" for i in range(3000))
+    cases = {
+        "sentences": sentences,
+        "one over-long sentence": run_on,
+        "sentences around an over-long sentence": f"{sentences} {run_on}. {sentences.replace('product', 'item').replace('brand', 'maker')}",
+    }
+
+    print("\n--- Running Chunk Overlap Tests ---")
+    for number, (name, text) in enumerate(cases.items(), start=1):
+        print(f"\nTest {number}: Splitting {name}...")
+        chunks = [chunk for chunk, _ in _split_text_into_chunks(text)]
+        if len(chunks) < 2:
+            print(f"❌ Test {number} Failed. Expected several chunks, got {len(chunks)}.")
+            tests_passed = False
+            continue
+
+        over_budget = [i for i, chunk in enumerate(chunks) if _count_tokens(chunk) > budget]
+        overlapping = sum(chunks[i + 1][:8] in chunks[i] for i in range(len(chunks) - 1))
+        if over_budget:
+            print(f"❌ Test {number} Failed. Chunks {over_budget} exceed the {budget} token budget.")
+            tests_passed = False
+        elif not overlapping:
+            print(f"❌ Test {number} Failed. No consecutive chunks overlap.")
+            tests_passed = False
+        elif rebuild_text(chunks) != text:
+            print(f"❌ Test {number} Failed. The chunks don't rebuild the original text.")
+            tests_passed = False
+        else:
+            print(f"✅ Test {number} Passed. {len(chunks)} chunks, {overlapping} overlapping boundaries.")
+
+    print("\n--- Test Summary ---")
+    if tests_passed:
+        print("✅ ALL TESTS PASSED!")
+    else:
+        print("❌ SOME TESTS FAILED. Please review the output above.")
+
+
+if __name__ == "__main__":
+    run_tests()